@@ -9,10 +9,11 @@ Criteria:
   * Additional methods available to do common operations and are available for free to each created class
   * Fixes Applescript programming in that workarounds are taken care of in the classes themselves
   * activate() is called by default with each command, this can be turned of using "with self.context_no_activate():"
+    (activation_policy skips it when this process already knows the app is frontmost)
 
 Caveat: Name collisions may exist, depending on use case: get around them by using self.application, self.standard_additions, or self.system_events
 
-Dependencies: appscript
+Dependencies: appscript (talked to through backend.py, which can be swapped for fakebackend.FakeBackend)
 
 Use: 
    * from ApplescriptWrapper.name_of_app import Klass
@@ -23,28 +24,107 @@ Use:
               AppleScriptWrapper.__init__(self, name_of_app)
 """
 
-import appscript
-from appscript.reference import CommandError
-import osax
-import copy
+from AppleScriptWrapper.backend import get_backend, set_backend
+from AppleScriptWrapper.batch import Batch, Recorder
+from AppleScriptWrapper.pacing import default_pacer
+from AppleScriptWrapper.menus import MenuSnapshot
+from AppleScriptWrapper.documents import DocumentIndex
+from AppleScriptWrapper.keystrokes import KeystrokeMacro, escape as escape_keystrokes
+from AppleScriptWrapper.tracing import Tracer, trace, untrace
+from AppleScriptWrapper.memo import PropertyMemo, MemoizedProperty, MutatingCommand, MUTATING
 import time
 import os
-import glob
-import collections
+import threading
+import random
+import importlib
+import weakref
 
 class User_Canceled(Exception): pass
 class GUIScriptingNotEnabled(Exception): pass
+class WaitTimeout(Exception): pass
 
-def get_app(app_name):
-    verbose = True
-    try:
-        a = __import__('AppleScriptWrapper.'+app_name, globals(), locals(), ['Klass'], -1).Klass()
-        verbose and print("Found {} in AppleScriptWrapper package".format(app_name))
-    except ImportError:
-        print('hi')
-        a = AppleScriptWrapper(app_name)
-        verbose and print("Not found {} in AppleScriptWrapper package".format(app_name))
-    return a
+class AppRegistry(object):
+    """
+    Knows which module of this package wraps which application, imports each of them once,
+    and keeps the wrapper instances it hands out so that they can be reused
+    Pass weak=True to only hold on to instances while something else is using them
+    """
+    modules = {'Finder': 'Finder', 'Firefox': 'Firefox', 'Keynote': 'Keynote', 'Pages': 'Pages',
+               'Photo Booth': 'PhotoBooth', 'Preview': 'Preview', 'ProVoc': 'ProVoc',
+               'QuickTime Player': 'QuickTime', 'Safari': 'Safari', 'System Preferences': 'SystemPreferences',
+               'TextEdit': 'TextEdit', 'Microsoft Word': 'Word', 'iTunes': 'iTunes'}
+
+    def __init__(self, weak=False):
+        self.modules = dict(self.modules)
+        self._classes = {}   # app name -> Klass, or None if it's not in the package
+        self._instances = weakref.WeakValueDictionary() if weak else {}
+        self._lock = threading.RLock()
+
+    def register(self, app_name, module_name):
+        """ module_name is relative to this package, for example 'QuickTime' """
+        with self._lock:
+            self.modules[app_name] = module_name
+            self._classes.pop(app_name, None)
+            self._instances.pop(app_name, None)
+
+    def wrapper_class(self, app_name):
+        """ Klass that wraps app_name, or None if there isn't one in the package """
+        try:
+            return self._classes[app_name]
+        except KeyError:
+            pass
+        verbose = True
+        module_name = self.modules.get(app_name, app_name.replace(' ', ''))
+        full_name = 'AppleScriptWrapper.' + module_name
+        try:
+            module = importlib.import_module(full_name)
+        except ModuleNotFoundError as e:
+            if e.name != full_name:
+                raise   # the module is there but something it imports isn't, which is a bug to see
+            module = None
+        klass = getattr(module, 'Klass', None)
+        if klass is not None:
+            verbose and print("Found {} in AppleScriptWrapper package".format(app_name))
+        else:
+            verbose and print("Not found {} in AppleScriptWrapper package".format(app_name))
+        self._classes[app_name] = klass
+        return klass
+
+    def create(self, app_name):
+        klass = self.wrapper_class(app_name)
+        if klass is None:
+            return AppleScriptWrapper(app_name)
+        return klass()
+
+    def get(self, app_name):
+        """ Returns the wrapper for app_name, creating it only if there isn't one already """
+        a = self._instances.get(app_name)
+        if a is None:
+            with self._lock:
+                a = self._instances.get(app_name)
+                if a is None:
+                    a = self.create(app_name)
+                    self._instances[app_name] = a
+        return a
+
+    def forget(self, app_name=None):
+        """ Drop cached wrapper(s), so the next get makes a new one """
+        with self._lock:
+            if app_name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(app_name, None)
+
+app_registry = AppRegistry()
+
+def get_app(app_name, cached=True):
+    """
+    Returns the wrapper for app_name, the package's own Klass if there is one
+    Wrappers are shared unless cached is False
+    """
+    if cached:
+        return app_registry.get(app_name)
+    return app_registry.create(app_name)
 
 def get_front_app():
     """
@@ -66,63 +146,304 @@ def reveal_in_finder(what):
     get_app("Finder").reveal(what)
 
 def get_name_of_front_application():
-    return appscript.app('System Events').processes[appscript.its.frontmost == True].processes[1].short_name()
+    backend = get_backend()
+    return backend.app('System Events').processes[backend.its.frontmost == True][1].short_name()
 
 def get_list_of_every_open_application():
-    return [name for name in appscript.app('System Events').processes.short_name() if isinstance(name, str)]
+    return [name for name in get_backend().app('System Events').processes.short_name() if isinstance(name, str)]
 
 def choose_from_list(llist, *args, **kwargs):
-    return AppleScriptWrapper(get_name_of_front_application()).choose_from_list_convenience(llist, *args, **kwargs)
+    return get_app(get_name_of_front_application()).choose_from_list_convenience(llist, *args, **kwargs)
+
+def use_backend(backend):
+    """
+    Switches every wrapper made from now on to backend (see backend.py), and forgets the ones made with the old one
+    """
+    set_backend(backend)
+    app_registry.forget()
+    standard_additions_pool.clear()
+    RouteCache.invalidate_all()
+    activation_policy.forget()
+    return backend
+
+class RouteCache(object):
+    """
+    Remembers where App_Dictionary_Only.__getattr__ found each name: 'application', 'default_target',
+    'system_events', 'standard_additions', or MISS if it wasn't found anywhere
+    One cache is shared by every instance of a wrapper class that targets the same application
+    """
+    MISS = 'miss'
+    _caches = {}
+
+    def __init__(self):
+        self._routes = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_wrapper(cls, wrapper):
+        key = (type(wrapper), wrapper.app_name, id(wrapper.backend))
+        cache = cls._caches.get(key)
+        if cache is None:
+            cache = cls._caches.setdefault(key, cls())
+        return cache
+
+    @classmethod
+    def invalidate_all(cls):
+        for cache in list(cls._caches.values()):
+            cache.invalidate()
+
+    def lookup(self, name):
+        """ Returns route for name, or None if it has to be probed """
+        route = self._routes.get(name)
+        if route is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return route
+
+    def store(self, name, route):
+        self._routes[name] = route
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._routes.clear()
+        else:
+            self._routes.pop(name, None)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._routes)}
+
+class OSAXPool(object):
+    """
+    Process-wide pool of Standard Additions (osax.OSAX) instances, keyed by the app they target (None for this process)
+    Launching an osax is very slow, so they are created lazily, shared between wrappers, and dropped after idle_timeout seconds unused
+    """
+    def __init__(self, idle_timeout=600):
+        self.idle_timeout = idle_timeout
+        self._pool = {}   # app name -> [osax, time last used]
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def get(self, app_name=None):
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._pool.get(app_name)
+            if entry is None:
+                entry = self._pool[app_name] = [self._create(app_name), now]
+                self.created += 1
+            else:
+                entry[1] = now
+                self.reused += 1
+            return entry[0]
+
+    def _create(self, app_name):
+        return get_backend().osax(app_name)
+
+    def warm_up(self, *app_names, **kwargs):
+        """
+        Launches the osax for each app ahead of time by sending it a harmless command
+        Pass background=True to do it in a thread and return straight away
+        """
+        app_names = app_names or (None,)
+        if kwargs.get('background'):
+            t = threading.Thread(target=self.warm_up, args=app_names)
+            t.daemon = True
+            t.start()
+            return t
+        for app_name in app_names:
+            self.get(app_name).current_date()
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.time())
+
+    def _evict_idle(self, now):
+        if self.idle_timeout is None:
+            return
+        for app_name, (sa, last_used) in list(self._pool.items()):
+            if now - last_used > self.idle_timeout:
+                del self._pool[app_name]
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._pool.clear()
+
+    def stats(self):
+        return {'size': len(self._pool), 'created': self.created, 'reused': self.reused, 'evicted': self.evicted}
+
+standard_additions_pool = OSAXPool()
+
+class ActivationPolicy(object):
+    """
+    Decides whether auto-activation really has to send activate
+    Remembers which app this process last brought to the front, and only checks that it is still frontmost
+    once every `window` seconds; activate is sent only if focus has actually left
+    Shared by every wrapper, since only one app can be frontmost
+    """
+    def __init__(self, window=2.0):
+        self.window = window
+        self.enabled = True
+        self._front = None     # app name we believe is frontmost
+        self._confirmed = 0    # when we last knew that to be true
+        self.sent = 0
+        self.skipped = 0
+        self.checks = 0
+
+    def should_activate(self, wrapper):
+        if not self.enabled or self._front != wrapper.app_name:
+            return True
+        if time.time() - self._confirmed < self.window:
+            self.skipped += 1
+            return False
+        self.checks += 1
+        try:
+            frontmost = wrapper.application.frontmost()
+        except Exception:
+            frontmost = False
+        if frontmost:
+            self._confirmed = time.time()
+            self.skipped += 1
+            return False
+        self._front = None
+        return True
+
+    def activated(self, app_name):
+        self.sent += 1
+        self._front = app_name
+        self._confirmed = time.time()
+
+    def forget(self, app_name=None):
+        """ Call when app_name has lost focus (or quit), or with None when unsure who has it """
+        if app_name is None or self._front == app_name:
+            self._front = None
+
+    def stats(self):
+        return {'sent': self.sent, 'skipped': self.skipped, 'checks': self.checks}
+
+activation_policy = ActivationPolicy()
 
 class App_Dictionary_Only(object):
     """
     Use this class if you know that you'll only need tell app statements
     """
     default_extension = ""
+    document_elements = 'documents'   # what the app calls its documents
 
     def __init__(self, app_name):
+        self.backend = get_backend()
+        self.tracer = None
+        self.memo = PropertyMemo()   # None to always ask, see memo.py
         self.set_application(app_name)   # sets up reference
         self.auto_activate = True
         self.reset_auto_activate_on_exit = False
         self._rerouted_target = None
         self.reset_default_target_on_exit = False
-        self._app_ref = appscript.app
+        self._app_ref = self.backend.app
+        self._batch = None
 
     def __getattr__(self, name):
         """
-        Old version
+        Routes attribute requests through the app dictionary, then the default target
+        Where a name was found is remembered in a RouteCache, so the (expensive) probe is only made once per process
         """
-        verbose = True
         if name == "default_target":
             if not self._rerouted_target:
                 return self._default_target()
             else:
-                if isinstance(self._rerouted_target, collections.Callable):
+                if callable(self._rerouted_target):
                     return self._rerouted_target()
                 else:
                     return self._rerouted_target
+        if name.startswith('__'):
+            raise AttributeError(name)
+        routes = self.__dict__.get('_routes')
+        if routes is None:
+            raise AttributeError(name)   # not set up yet
+        route = routes.lookup(name)
+        if route is None:
+            try:
+                route, g = self._probe_route(name)
+            except AttributeError:
+                routes.store(name, RouteCache.MISS)
+                raise AttributeError("Unknown attribute {0}".format(name))
+            routes.store(name, route)
+        elif route == RouteCache.MISS:
+            raise AttributeError("Unknown attribute {0}".format(name))
         else:
+            g = getattr(self._route_target(route), name)
+        if self.__dict__.get('_batch') is not None:
+            return Recorder(self._batch, g)   # activates once, when the batch runs
+        memo = self.__dict__.get('memo')
+        if name in MUTATING:
+            g = MutatingCommand(self._mutated, g)   # whether or not there's a memo, there may be other caches
+        elif memo is not None and memo.wants(name):
+            g = MemoizedProperty(memo, name, g)
+        if self.auto_activate:
+            self.auto_activate_now()
+        return g
+
+    def _probe_route(self, name):
+        """
+        Finds out where name lives, returns (route, object) or raises AttributeError
+        Subclasses extend this to look further afield
+        """
+        verbose = True
+        try:
+            g = getattr(self.application, name)  # application-level
             try:
-                g = getattr(self.application, name)  # application-level
-                if g:
-                    try:
-                        g()   # yuck
-                    except Exception as e:
-                        if str(e.args[2]) == "Command failed: Can't get reference. (-1728)":
-                            verbose and print("sending on to default target")
-                            raise AttributeError
-                    if self.auto_activate:
-                        self.activate()
-                    verbose and print("getattr returning self.application.{0}".format(name))
-                    return g
-            except AttributeError as CommandError:
-                g = getattr(self.default_target, name)  # target-level, usually 'front document'
-                if g:
-                    if self.auto_activate:
-                        self.activate()
-                    verbose and print("getattr returning self.default_target: {0}".format(g))
-                    return g
-        return None
+                g()   # yuck
+            except Exception as e:
+                if self.backend.is_missing_reference(e):
+                    verbose and print("sending on to default target")
+                    raise AttributeError
+            verbose and print("getattr returning self.application.{0}".format(name))
+            return 'application', g
+        except AttributeError:
+            g = getattr(self.default_target, name)  # target-level, usually 'front document'
+            verbose and print("getattr returning self.default_target: {0}".format(g))
+            return 'default_target', g
+
+    def _route_target(self, route):
+        """ Object that the route refers to """
+        if route == 'application':
+            return self.application
+        if route == 'default_target':
+            return self.default_target
+        raise AttributeError("Unknown route {0}".format(route))
+
+    def invalidate_routes(self, name=None):
+        """
+        Forget where name (or every name, if None) was found, for example after the app's state has changed
+        Shared with every other wrapper of this class that targets the same application
+        """
+        self._routes.invalidate(name)
+
+    def route_stats(self):
+        return self._routes.stats()
+
+    def enable_tracing(self, tracer=None):
+        """
+        Records every event this wrapper sends from now on, see tracing.py
+        Pass a tracer to share one between wrappers; returns the tracer in use
+        """
+        self.tracer = tracer or self.tracer or Tracer()
+        self._retrace()
+        return self.tracer
+
+    def disable_tracing(self):
+        """ Stops recording, returns the tracer so that what it has can still be looked at """
+        tracer, self.tracer = self.tracer, None
+        self._retrace()
+        return tracer
+
+    def _retrace(self):
+        """ Wraps (or unwraps) the references the wrapper holds on to to match self.tracer """
+        self.application = trace(self.tracer, self.app_name, untrace(self.application))
     """
 
     def __getattr__(self, name):
@@ -154,32 +475,122 @@ class App_Dictionary_Only(object):
         return None
     """
     
+    def batch(self, executor=None):
+        """
+        with self.batch(): records commands and sends them all when the block exits, see batch.py
+        executor can be given to change how the compiled batch is sent, eg batch.RecordingExecutor
+        """
+        if self._batch is not None:
+            return self._batch
+        return Batch(self, executor)
+
+    def send(self, command, *args, **kwargs):
+        """
+        Calls command (eg some_reference.set) with args, or records it if inside a batch, in which case a Future is returned
+        """
+        if self._batch is not None:
+            return self._batch.record(command, *args, **kwargs)
+        try:
+            return command(*args, **kwargs)
+        finally:
+            self._mutated()
+
+    def _mutated(self, *names):
+        """
+        The one place caches of what the app would answer are forgotten: called for every command in memo.MUTATING
+        sent through __getattr__, for send, for batches, and by wrapper methods that change the app through
+        self.application, which nothing else would notice. names limits it to those properties
+        """
+        if self.memo is not None:
+            self.memo.invalidate(*names)
+
+    def remembered(self, name, reference, *args, **kwargs):
+        """
+        reference(*args, **kwargs), through the memo if name is a property it remembers
+        For wrapper methods that ask the app directly, eg return self.remembered('playing', self.application.playing)
+        """
+        if self.memo is None or not self.memo.wants(name):
+            return reference(*args, **kwargs)
+        return self.memo.fetch(name, reference, args, kwargs)
+
+    async def acall(self, method, *args, **kwargs):
+        """
+        await wrapper.acall('method_name', *args): runs it on the shared pool without blocking the event loop, see aio.py
+        method can also be any callable, eg a reference
+        """
+        from AppleScriptWrapper import aio   # keeps asyncio out of the import until it's wanted
+        return await aio.call(self, method, *args, **kwargs)
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Queues a call on the scheduler (see scheduler.py) behind anything else for this app, returns a Future
+        method is a name or a callable, as for acall; priority=scheduler.INTERACTIVE|NORMAL|BULK can be given
+        """
+        from AppleScriptWrapper.scheduler import scheduler
+        if not callable(method):
+            return scheduler.submit(self.app_name, self.call_by_name, method, *args, **kwargs)
+        return scheduler.submit(self.app_name, method, *args, **kwargs)
+
+    def call_by_name(self, method, *args, **kwargs):
+        """
+        getattr(self, method)(*args, **kwargs), for acall and submit to run where the call is made:
+        looking a name up can probe the app and activate it, which mustn't happen on the caller's thread
+        """
+        return getattr(self, method)(*args, **kwargs)
+
     def quit(self):
         self.application.quit()
+        activation_policy.forget(self.app_name)
+        self._mutated()
 
     def activate(self):
         """ activates, brings to front """
         """ needed to define at this level to avoid recursion in getattr traffic """
         self.application.activate()
+        activation_policy.activated(self.app_name)
+        self._mutated('frontmost')
+
+    def auto_activate_now(self):
+        """ What auto_activate does: activates unless activation_policy knows we're frontmost already """
+        if activation_policy.should_activate(self):
+            self.activate()
 
     def is_running(self):
         return self.isrunning()
 
     def set_application(self, app_name):
         self.app_name = app_name
-        self.application = appscript.app(app_name)
+        self.application = trace(self.tracer, app_name, self.backend.app(app_name))
+        self._routes = RouteCache.for_wrapper(self)
        
     def get_app(self):
         return self.application
 
     def k(self, constant):
         """ Access to appscript k constants """
-        return getattr(appscript.k, constant)
+        return getattr(self.backend.k, constant)
 
     def convert_options_to_list(self, dictionary):
         """ Convert dictionary to list of k constants, useful for convenience methods """
         return [self.k(key) for key in dictionary]
 
+    def snapshot(self, reference, fields):
+        """
+        Record of several properties of reference, fetched with one request, see snapshot.py
+        reference can be the name of one of the app's objects, eg 'documents[0]' isn't but 'selection' is
+        """
+        from AppleScriptWrapper.snapshot import snapshot
+        if isinstance(reference, str):
+            reference = getattr(self.application, reference)
+        return snapshot(reference, fields, self.backend)
+
+    def snapshot_elements(self, reference, fields):
+        """ List of records, one per element of reference (eg self.application.documents), in one request """
+        from AppleScriptWrapper.snapshot import snapshot_elements
+        if isinstance(reference, str):
+            reference = getattr(self.application, reference)
+        return snapshot_elements(reference, fields, self.backend)
+
     def get_object(self, objekt):
         """ Access to appscript objects """
         return getattr(self.application, objekt)
@@ -258,49 +669,98 @@ class App_SystEvents_StndAdditions(App_Dictionary_Only):
         App_Dictionary_Only.__init__(self, *args, **kwargs)
         self.standard_additions = None
         self.system_events = None
-        
-    def __getattr__(self, name):
+
+    def _retrace(self):
+        App_Dictionary_Only._retrace(self)
+        self.system_events = trace(self.tracer, 'System Events', untrace(self.system_events))
+        self.standard_additions = trace(self.tracer, 'Standard Additions', untrace(self.standard_additions))
+
+    def _probe_route(self, name):
         """
         Routes attribute requests through app dictionary by default, then System Events dictionary, then Standard Additions
         Name collisions are not resolved, use internal objects explicity to resolve them
         """
         verbose = False
         try:
-            return App_Dictionary_Only.__getattr__(self, name)
+            return App_Dictionary_Only._probe_route(self, name)
         except AttributeError:
             try:
-                if not self.system_events:
-                    self.system_events = appscript.app('System Events').processes[self.app_name]
-                g = getattr(self.system_events, name)
-                if g:
-                    if self.auto_activate:
-                        self.activate()  # GUI scripting requires app to be activated
-                    verbose and print("Returning self.system_events.{0}".format(name))
-                    return g
+                g = getattr(self._route_target('system_events'), name)
+                verbose and print("Returning self.system_events.{0}".format(name))
+                return 'system_events', g   # GUI scripting requires app to be activated, done in __getattr__
             except AttributeError:
-                if not self.standard_additions:
-                    self.standard_additions = osax.OSAX(name=self.app_name)  # launches an osax, very slow, egro we make it dynamic ... and last
-                try:
-                    g = getattr(self.standard_additions, name)
-                    if g:
-                        if self.auto_activate:
-                            self.activate()
-                        verbose and print("Returning self.standard_additions.{0}".format(name))
-                        return g
-                except AttributeError:
-                    raise AttributeError("Unknown attribute!")
+                g = getattr(self._route_target('standard_additions'), name)
+                verbose and print("Returning self.standard_additions.{0}".format(name))
+                return 'standard_additions', g
+
+    def _route_target(self, route):
+        if route == 'system_events':
+            if not self.system_events:
+                self.system_events = trace(self.tracer, 'System Events', self.backend.app('System Events').processes[self.app_name])
+            return self.system_events
+        if route == 'standard_additions':
+            if not self.standard_additions:
+                self.standard_additions = trace(self.tracer, 'Standard Additions', standard_additions_pool.get(self.app_name))  # launching an osax is very slow, so pooled, and last
+            return self.standard_additions
+        return App_Dictionary_Only._route_target(self, route)
+
+class WaitReport(object):
+    """ What happened during a wait_until: truthy if the condition was met """
+    def __init__(self):
+        self.satisfied = False
+        self.value = None
+        self.probes = 0
+        self.elapsed = 0
+        self.timed_out = False
+        self.cancelled = False
+
+    def __bool__(self):
+        return self.satisfied
+
+    def __repr__(self):
+        return "<WaitReport satisfied={0} probes={1} elapsed={2:.3f}s timed_out={3} cancelled={4}>".format(
+            self.satisfied, self.probes, self.elapsed, self.timed_out, self.cancelled)
 
 class AppleScriptWrapper(App_SystEvents_StndAdditions):
 
     def __init__(self, name):
         App_SystEvents_StndAdditions.__init__(self, name)
         self._wait = 0.25
+        self.pacer = default_pacer   # None for fixed waits of self._wait
+        self.menu_snapshot_ttl = 2.0   # 0 to always ask System Events directly
+        self._menu_snapshot = None
+        self.document_index_ttl = 1.0
+        self._document_index = None
         
+    def document_index(self, refresh=False):
+        """ DocumentIndex of the open documents, read in one request and re-read after self.document_index_ttl seconds """
+        if self._document_index is None:
+            self._document_index = DocumentIndex(getattr(self.application, self.document_elements), self.backend,
+                                                 self.document_index_ttl)
+        if refresh:
+            self._document_index.refresh()
+        return self._document_index.fresh()
+
+    def invalidate_document_index(self):
+        if self._document_index is not None:
+            self._document_index.invalidate()
+
+    def _mutated(self, *names):
+        App_SystEvents_StndAdditions._mutated(self, *names)
+        if not names:
+            self.invalidate_document_index()
+
     def get_list_of_documents(self):
-        return self.application.documents[:]
+        """ References to every open document, front first """
+        return [entry.reference for entry in self.document_index(refresh=True)]
 
     def file_is_open(self, title):
-        return title in [f.name() for f in self.get_list_of_documents()]
+        """
+        title is a document's name or path; one request however many are open
+        The index is re-read after any command the wrapper sends that opens, closes, makes or saves something (see _mutated),
+        but not after commands sent through self.application directly, which are only noticed once document_index_ttl is up
+        """
+        return self.document_index().is_open(title)
 
 #    def close(self):
 #        print self.current_document()
@@ -308,12 +768,15 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
 
     def close_without_saving(self):
         self.application.close(self.current_document(), saving=self.k('no'))
+        self._mutated()
 
     def save(self):
         self.application.save(self.current_document())
+        self._mutated()
 
     def save_as(self, path):
         self.application.save(self.current_document(), in_=path)
+        self._mutated()
 
     def save_as_pdf(self, path=None):
         """
@@ -338,22 +801,117 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
         Saves current document using gui scripting, if confirm is false then lets user check and hit return 
         
         """
-        self.command_down('s')
+        self.type_macro('{command+s}{wait}')
         path = self.resolve_name_collision(path)
         self.navigate_using_goto(path, confirm=confirm)
 
     def navigate_using_goto(self, path, confirm=False):
-        self.command_down('G')
-        self.keystroke(path)
-        self.keystroke_return()
+        macro = '{command+G}{wait}' + escape_keystrokes(path) + '{return}'
         if confirm:
-            self.keystroke_return()
+            macro += '{wait}{return}'
+        self.type_macro(macro)
 
     def wait(self, times_longer=1):
         time.sleep(self._wait * times_longer)
 
-    def menu_item_present(self, menu, item):
-        """ Returns menu item object if exists, false if not, can be used to see if present """
+    def wait_until(self, predicate, timeout=30, interval=0.05, max_interval=1.0, backoff=1.5, jitter=0.1,
+                   cancel=None, raise_on_timeout=False):
+        """
+        Calls predicate until it returns something truthy, use instead of spinning in a loop
+        Sleeps interval seconds between probes, growing by backoff up to max_interval, varied by +/- jitter (a fraction)
+        Gives up after timeout seconds (None to wait forever), or as soon as cancel (a threading.Event) is set
+        Returns a WaitReport, also kept in self.last_wait, or raises WaitTimeout if asked to
+        """
+        report = WaitReport()
+        start = time.time()
+        deadline = None if timeout is None else start + timeout
+        delay = interval
+        while True:
+            report.probes += 1
+            value = predicate()
+            if value:
+                report.satisfied = True
+                report.value = value
+                break
+            now = time.time()
+            if deadline is not None and now >= deadline:
+                report.timed_out = True
+                break
+            sleep = delay * (1 + random.uniform(-jitter, jitter))
+            if deadline is not None:
+                sleep = min(sleep, deadline - now)
+            if cancel is not None:
+                if cancel.wait(sleep):
+                    report.cancelled = True
+                    break
+            else:
+                time.sleep(sleep)
+            delay = min(max_interval, delay * backoff)
+        report.elapsed = time.time() - start
+        self.last_wait = report
+        if report.timed_out and raise_on_timeout:
+            raise WaitTimeout(report)
+        return report
+
+    async def await_until(self, predicate, **kwargs):
+        """ wait_until for coroutines: takes the same arguments, but awaits between probes """
+        from AppleScriptWrapper import aio
+        return await aio.wait_until(self, predicate, **kwargs)
+
+    def pace(self, action):
+        """ Pause around GUI scripting actions, as short as self.pacer has learned it can be """
+        if self.pacer is None:
+            self.wait()
+        else:
+            self.pacer.pause(self.app_name, action)
+
+    def paced_success(self, action):
+        if self.pacer is not None:
+            self.pacer.success(self.app_name, action)
+
+    def paced_failure(self, action):
+        if self.pacer is not None:
+            self.pacer.failure(self.app_name, action)
+
+    def menu_snapshot(self, refresh=False):
+        """
+        MenuSnapshot of the app's menu bar, re-read once it's older than self.menu_snapshot_ttl seconds
+        """
+        snapshot = self._menu_snapshot
+        if refresh or snapshot is None or snapshot.expired():
+            if self.auto_activate:
+                self.auto_activate_now()   # GUI scripting requires app to be activated
+            snapshot = MenuSnapshot(self._route_target('system_events'), self.menu_snapshot_ttl).refresh()
+            self._menu_snapshot = snapshot
+        return snapshot
+
+    def invalidate_menu_snapshot(self, menu=None):
+        """ Forget the snapshot, or just what it says about menu """
+        if menu is None:
+            self._menu_snapshot = None
+        elif self._menu_snapshot is not None:
+            self._menu_snapshot.mark_stale(menu)
+
+    def _menu_entry(self, menu, item, submenu=None):
+        """
+        MenuEntry from the snapshot, which is re-read first if menu has been clicked in since it was taken
+        An item that isn't there may have appeared since (eg after a keystroke), so the snapshot is re-read once to be sure
+        """
+        snapshot = self._menu_snapshot
+        reread = snapshot is None or snapshot.expired() or menu in snapshot.stale
+        entry = self.menu_snapshot(refresh=reread).lookup(menu, item, submenu)
+        if entry is None and not reread:
+            entry = self.menu_snapshot(refresh=True).lookup(menu, item, submenu)
+        return entry
+
+    def menu_item_present(self, menu, item, live=False):
+        """
+        Returns menu item object if exists, false if not, can be used to see if present
+        Answered from the menu snapshot unless live is True or snapshots are turned off
+        """
+        if not live and self.menu_snapshot_ttl:
+            entry = self._menu_entry(menu, item)
+            return entry.reference if entry else False
         ref = self.menu_bars[1].menu_bar_items[menu].menus[menu].menu_items[item]
         try:
             ref = ref()
@@ -361,7 +919,10 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
             ref = False
         return ref
 
-    def submenu_item_present(self, menu, submenu, item):
+    def submenu_item_present(self, menu, submenu, item, live=False):
+        if not live and self.menu_snapshot_ttl:
+            entry = self._menu_entry(menu, item, submenu)
+            return entry.reference if entry else False
         ref = self.menu_bars[1].menu_bar_items[menu].menus[menu].menu_items[submenu].menus[submenu].menu_items[item]
         try:
             ref = ref()
@@ -369,60 +930,121 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
             ref = False
         return ref
 
-    def menu_item_enabled(self, menu, item):
-        ref = self.menu_item_present(menu, item)
+    def menu_item_enabled(self, menu, item, live=False):
+        if not live and self.menu_snapshot_ttl:
+            entry = self._menu_entry(menu, item)
+            return entry.enabled if entry else False
+        ref = self.menu_item_present(menu, item, live=True)
         if not ref: return False
         return ref.enabled()
 
-    def submenu_item_enabled(self, menu, submenu, item):
-        ref = self.submenu_item_present(menu, submenu, item)
+    def submenu_item_enabled(self, menu, submenu, item, live=False):
+        if not live and self.menu_snapshot_ttl:
+            entry = self._menu_entry(menu, item, submenu)
+            if not entry: raise Exception("Passed invalid menu and item to menu_item_enabled")
+            return entry.enabled
+        ref = self.submenu_item_present(menu, submenu, item, live=True)
         if not ref: raise Exception("Passed invalid menu and item to menu_item_enabled")
         return ref.enabled()            
 
-    def click_menu_item(self, menu, item):
-        ref = self.menu_item_present(menu, item)
-        if ref:
-            self.wait()
+    def _menu_item_reference(self, menu, item, submenu=None):
+        """ Reference to the item built from the names, without asking System Events anything """
+        ref = self.menu_bars[1].menu_bar_items[menu].menus[menu].menu_items
+        if submenu is not None:
+            ref = ref[submenu].menus[submenu].menu_items
+        return ref[item]
+
+    def _click_paced(self, menu, item, submenu=None):
+        """
+        Clicks the item in one request, pausing as the pacer sees fit; does nothing if there's no such item
+        A missing item may just mean the app wasn't ready, so the pacer backs off and it's tried once more
+        Only menu is marked stale in the menu snapshot
+        """
+        ref = self._menu_item_reference(menu, item, submenu)
+        self.pace('menu')
+        try:
             ref.click()
-            self.wait()   
+        except Exception:
+            self.paced_failure('menu')
+            self.pace('menu')
+            try:
+                ref.click()
+            except Exception:
+                return
+        self._mutated()
+        self.invalidate_menu_snapshot(menu)
+        self.pace('menu')
+        self.paced_success('menu')
+
+    def click_menu_item(self, menu, item):
+        self._click_paced(menu, item)
 
     def click_submenu_item(self, menu, submenu, item):
-        ref = self.submenu_item_present(menu, submenu, item)
-        if ref:
-            self.wait()
-            ref.click()
-            self.wait()
+        self._click_paced(menu, item, submenu)
 
     def toggle_menu_item(self, menu, item):
-        ref = self.menu_item_present(menu, item)
-        if ref:
-            self.wait()
-            ref.click()
-            self.wait()
+        self._click_paced(menu, item)
 
     def toggle_submenu_item(self, menu, submenu, item):
-        ref = self.submenu_item_present(menu, submenu, item)
-        if ref:
-            self.wait()
-            ref.click()
-            self.wait()
+        self._click_paced(menu, item, submenu)
 
-    def menu_item_checked(self, menu, item):
-        return self.menu_item_present(menu, item).selected()
+    def menu_item_checked(self, menu, item, live=False):
+        if not live and self.menu_snapshot_ttl:
+            return self._menu_entry(menu, item).checked
+        return self.menu_item_present(menu, item, live=True).selected()
 
     def keystroke_convenience(self, key, times=1, **keysdown):
         """ convenience method for all keystrokes with **keysdown passed as named options """
-        self.wait()
+        self.pace('keystroke')
         options = self.convert_options_to_list(keysdown)
+        if isinstance(key, str):
+            key, times = key * times, 1   # one event types them all
         for i in range(0, times):
-            if options:
-                self.keystroke(key, using=options)
-            else:
-                self.keystroke(key)
-        self.wait()
+            try:
+                if options:
+                    self.keystroke(key, using=options)
+                else:
+                    self.keystroke(key)
+            except Exception:
+                self.paced_failure('keystroke')
+                raise
+        self.pace('keystroke')
+        self.paced_success('keystroke')
+
+    def type_macro(self, macro):
+        """
+        Types a keystroke macro such as "{command+G}{wait}~/Desktop{return}", see keystrokes.py
+        Compiled so that runs of text and repeated keys go out as single System Events calls
+        """
+        if not isinstance(macro, KeystrokeMacro):
+            macro = KeystrokeMacro(macro)
+        self.pace('keystroke')
+        for kind, what, modifiers in macro.ops:
+            if kind == 'wait':
+                if what is None:
+                    self.pace('keystroke')
+                else:
+                    time.sleep(what)
+                continue
+            command = self.keystroke if kind == 'keystroke' else self.key_code
+            if kind == 'key_code' and len(what) == 1:
+                what = what[0]
+            options = self.convert_options_to_list(modifiers)
+            try:
+                if options:
+                    command(what, using=options)
+                else:
+                    command(what)
+            except Exception:
+                self.paced_failure('keystroke')
+                raise
+        self.pace('keystroke')
+        self.paced_success('keystroke')
+        return macro
 
     def check_menu_item(self, menu, item, boolean):
         self.menu_item_present(menu, item).selected.set(boolean)      
+        self.invalidate_menu_snapshot(menu)
 
     def keystroke_return(self):
         self.keystroke_convenience('\r')
@@ -448,11 +1070,16 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
             this_idiom = possible_idioms[idiom.lower()]
         except:
             return  # no error
-        self.wait()
-        if options:
-            self.key_code(this_idiom, using=options)
-        else:
-            self.key_code(this_idiom)
+        self.pace('key_code')
+        try:
+            if options:
+                self.key_code(this_idiom, using=options)
+            else:
+                self.key_code(this_idiom)
+        except Exception:
+            self.paced_failure('key_code')
+            raise
+        self.paced_success('key_code')
 
     def display_alert_convenience(self, prompt, message, as_="warning", **kwargs):
         possible_alert_kinds = {'warning':self.k('warning')}
@@ -483,6 +1110,12 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
                 raise User_Canceled
             return response[self.k('text_returned')]            
 
+    async def adisplay_dialog_convenience(self, prompt, *args, **kwargs):
+        return await self.acall(self.display_dialog_convenience, prompt, *args, **kwargs)
+
+    async def adisplay_alert_convenience(self, prompt, message, *args, **kwargs):
+        return await self.acall(self.display_alert_convenience, prompt, message, *args, **kwargs)
+
     def get_int_input(self, prompt, default_answer="1", buttons=['Cancel', 'OK'],
                       default_button=2, minimum=0, maximum=10000):
         num = minimum - 1
@@ -513,17 +1146,23 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
         else:
             return response
 
+    async def achoose_from_list_convenience(self, prompt, llist, *args, **kwargs):
+        return await self.acall(self.choose_from_list_convenience, prompt, llist, *args, **kwargs)
+
     def choose_file_convenience(self, prompt, file_types, **kwargs):
         """ will take list of dot notated file types """
         if not isinstance(file_types, list): file_types = [file_types]
         file_types = [f.lstrip('.') for f in file_types]
         return self.choose_file(with_prompt=prompt, of_type=file_types, **kwargs)
 
+    async def achoose_file_convenience(self, prompt, file_types, **kwargs):
+        return await self.acall(self.choose_file_convenience, prompt, file_types, **kwargs)
+
     def tell_app_to_do(self, app, do, *args, **kwargs):
         """
         Depreciated, should use module-level method instead
         """
-        f = getattr(appscript.app(app), do)
+        f = getattr(self.backend.app(app), do)
         f(*args, **kwargs)
 
     def ensure_gui_scripting_activated(self, app_name="This application"):
@@ -532,7 +1171,7 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
         """
 
         def enabled():
-            return app("System Events").UI_elements_enabled()
+            return self.backend.app("System Events").UI_elements_enabled()
 
         if not enabled:
             from .SystemPreferences import SystemPreferences
@@ -544,7 +1183,7 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
             sys.activate()
             with self.context_no_activate():
                 self.display_alert_convenience("Click OK when you have enabled access for assistive devices in the Universal Access preference pane", "")
-        enabled = app("System Events").UI_elements_enabled()
+        enabled = self.backend.app("System Events").UI_elements_enabled()
         if not enabled:
             self.display_alert_convenience("you haven't enabled access for assistive devices.", "{} is quitting now.".format(app_name))
             raise GUIScriptingNotEnabled
@@ -560,25 +1199,25 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
         if not self._start_time: return 0
         return (time.time() - self._start_time) / 60
 
-    def do_shell_script_convenience(self, command, authenticate=False, async=False, **kwargs):
-        """ authenticate and asyncs are possible """
+    def do_shell_script_convenience(self, command, authenticate=False, async_=False, **kwargs):
+        """ authenticate and asyncs are possible (async_, as async is reserved from python 3.7) """
         if authenticate:
-            sa = osax.OSAX()  # new instance needed
+            sa = standard_additions_pool.get()  # not the one that targets this app
             sa.activate()
             result = sa.do_shell_script(command, administrator_privileges=True, **kwargs)
             self.activate()
             return result
         else:
             import subprocess
-            p = suprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
-            if not async:
+            p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+            if not async_:
                 return p.communicate()
             else:
                 return p
 
     def do_in_thread(self, do, *args, **kwargs):
-        import threading
-        t = threading.Thread(target=do, *args, **kwargs)
+        """ Calls do(*args, **kwargs) in a new thread, which is returned; see acall for running lots of things at once """
+        t = threading.Thread(target=do, args=args, kwargs=kwargs)
         t.start()
         return t
 
@@ -589,6 +1228,7 @@ class AppleScriptWrapper(App_SystEvents_StndAdditions):
         _path, _file_name = os.path.split(path)
         _file, _ext  = os.path.splitext(_file_name)
         if _file_name in os.listdir(_path):
+            import glob
             files_already = glob.glob("{1}-*{2}".format(_path, _file, _ext))
             if len(files_already) == 1:
                 return "{0}/{1}-1{2}".format(_path, _file, _ext)
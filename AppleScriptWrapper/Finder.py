@@ -6,10 +6,10 @@ Works with classes or dictionaries
 """
 
 from AppleScriptWrapper.Basic import AppleScriptWrapper
-import mactypes
+from AppleScriptWrapper.tracing import span
+import io
 import os
 import re
-import collections
 
 def movieoutput(s):
     print(s)
@@ -51,7 +51,7 @@ class Klass(AppleScriptWrapper):
         """
         Returns a Finder reference form ... not quite the same as alias reference form!
         """
-        return self.application.items[mactypes.Alias(path)]
+        return self.application.items[self.backend.alias(path)]
 
     def alias_from_whatever(self, whatever):
         """
@@ -60,28 +60,28 @@ class Klass(AppleScriptWrapper):
         """
         verbose = False
         verbose and output("Returning the following from alias_from_whatever:")
-        if isinstance(whatever, file):
+        if isinstance(whatever, io.IOBase):
             verbose and output( "Alias(whatever.name)" )
-            return mactypes.Alias(whatever.name)
-        elif isinstance(whatever, mactypes.Alias):
+            return self.backend.alias(whatever.name)
+        elif isinstance(whatever, self.backend.Alias):
             verbose and output("whatever")
             return whatever
         elif hasattr(whatever, 'path'):
-            if isinstance(whatever.path, collections.Callable):
+            if callable(whatever.path):
                 verbose and output("Alias(whatever.path())")
-                return mactypes.Alias(whatever.path())
+                return self.backend.alias(whatever.path())
             else:
                 verbose and output("Alias(whatever.path)", whatever.path)
-                return mactypes.Alias(whatever.path)
+                return self.backend.alias(whatever.path)
         elif not isinstance(whatever, str) and 'path' in whatever:
             verbose and output("whatever['path']", whatever['path'])
-            return mactypes.Alias(whatever['path'])
+            return self.backend.alias(whatever['path'])
         elif isinstance(whatever, list):
             # recurively derive list
             return [self.alias_from_whatever(item) for item in whatever]
         else:
             verbose and output("Alias(whatever)")
-            return mactypes.Alias(whatever)
+            return self.backend.alias(whatever)
 
     def path_from_whatever(self, whatever):
         """ Reverse operation of alias_from_whatever """
@@ -90,12 +90,12 @@ class Klass(AppleScriptWrapper):
                 return whatever
         except TypeError:
             pass  # "cannot convert object to str implicitely" error
-        if isinstance(whatever, file):
+        if isinstance(whatever, io.IOBase):
             return whatever.name
-        elif isinstance(whatever, mactypes.Alias):
+        elif isinstance(whatever, self.backend.Alias):
             return whatever.path
         elif hasattr(whatever, 'path'):
-            if isinstance(whatever.path, collections.Callable):
+            if callable(whatever.path):
                 return whatever.path()
             else:
                 return whatever.path
@@ -110,6 +110,7 @@ class Klass(AppleScriptWrapper):
     def set_label_for_path(self, label, path):
         alias = self.alias_from_whatever(path)
         alias.label.set(label)
+        self._mutated()
 
     # The following methods are not convenience functions but attempting to override Finder's need for files and/or aliases
     def open(self, f, using=None):
@@ -117,22 +118,25 @@ class Klass(AppleScriptWrapper):
         @using string of application to open
         """
         if using:
-            self.application.open(self.alias_from_whatever(path), using=appscript.app(using))
+            self.application.open(self.alias_from_whatever(f), using=self.backend.app(using))
         else:
-            self.application.open(self.alias_from_whatever(path))
+            self.application.open(self.alias_from_whatever(f))
+        self._mutated()
 
     def reveal(self, path):
         self.application.reveal(self.alias_from_whatever(path))
+        self._mutated()
 
     def select(self, path):
         self.application.select([self.alias_from_whatever(p) for p in path])
+        self._mutated()
 
     def spotlight_set_comment(self, path, comment):
         """
         Sets spotlight comment, use with care
         """
         ref = self.reference_from_path(path)
-        ref.comment.set(comment)
+        return self.send(ref.comment.set, comment)
 
     def spotlight_add_comment(self, path, comment, no_duplicates=True):
         """
@@ -166,6 +170,7 @@ class Klass(AppleScriptWrapper):
             new_comment = "".join(old_comment.split(comment))
             self.spotlight_set_comment(path, new_comment)
 
+    @span()
     def move(self, paths, to=None, to_idiom=None):
         """
         to_idiom ['trash']
@@ -174,20 +179,20 @@ class Klass(AppleScriptWrapper):
             return  # raise error?
         
         if not isinstance(paths, list):
-            paths = [path]
-        else:
-            paths = [self.reference_from_path(p) for p in paths]
+            paths = [paths]
+        paths = [self.reference_from_path(p) for p in paths]
 
         if not to_idiom and to:
-            the_to = mactypes.Alias(to)
+            the_to = self.backend.alias(to)
         elif to_idiom:
-            the_to = getattr(self._app_ref, to_idiom.lower())
+            the_to = getattr(self.application, to_idiom.lower())
 
         self.application.move(paths, to=the_to)
+        self._mutated()
 
     def rename(self, path, new_name):
         ref = self.reference_from_path(path)
-        ref.name.set(new_name)
+        return self.send(ref.name.set, new_name)
 
 if __name__ == '__main__':
 
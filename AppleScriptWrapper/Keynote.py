@@ -3,7 +3,10 @@
 # I use _surrounding_underscores_ to denote primitive types
 
 from AppleScriptWrapper.Basic import AppleScriptWrapper
+from AppleScriptWrapper.tracing import span
+from AppleScriptWrapper.editqueue import EditQueue
 import re
+import bisect
 
 class CalledFunctionAssumingPlayModeButNotPlaying(Exception): pass
 class CalledFunctionAssumingNotPlayModeButPlaying(Exception): pass
@@ -18,21 +21,72 @@ def convenience(statement, *args, **kwargs):
     a = Klass()
     return getattr(a, statement)(*args, **kwargs)
 
+def longest_increasing_subsequence(sequence):
+    """ Set of the items of one longest increasing subsequence of sequence, in O(n log n) """
+    tails = []      # tails[i]: smallest item ending an increasing run of length i + 1
+    ends = []       # ends[i]: its index in sequence
+    previous = []   # previous[i]: index of the item before sequence[i] in the run it ends
+    for i, item in enumerate(sequence):
+        length = bisect.bisect_left(tails, item)
+        previous.append(ends[length - 1] if length else None)
+        if length == len(tails):
+            tails.append(item)
+            ends.append(i)
+        else:
+            tails[length] = item
+            ends[length] = i
+    kept = set()
+    i = ends[-1] if ends else None
+    while i is not None:
+        kept.add(sequence[i])
+        i = previous[i]
+    return kept
+
+def plan_reorder(new_order):
+    """
+    Fewest single-slide moves that turn slides 1..n into new_order (a list of the current slide numbers in the order wanted)
+    Slides in a longest increasing subsequence of new_order stay put, the rest are moved one by one
+    Returns a list of (position, anchor, 'before' or 'after'): move the slide now at position to before/after the one at anchor,
+    both positions being as they are just before that move is made
+    """
+    current = list(range(1, len(new_order) + 1))
+    if sorted(new_order) != current:
+        raise ValueError("new_order must have each slide number from 1 to {0} once".format(len(new_order)))
+    kept = longest_increasing_subsequence(new_order)
+    moves = []
+    for i, slide in enumerate(new_order):
+        if slide in kept:
+            continue
+        position = current.index(slide)
+        if i == 0:
+            moves.append((position + 1, 1, 'before'))
+            current.pop(position)
+            current.insert(0, slide)
+        else:
+            moves.append((position + 1, current.index(new_order[i - 1]) + 1, 'after'))
+            current.pop(position)
+            current.insert(current.index(new_order[i - 1]) + 1, slide)
+    return moves
+
 class Klass(AppleScriptWrapper):
     """
     Control Keynote with applescript
     """
     default_extension = ".key"
+    document_elements = 'slideshows'
     
-    def __init__(self, slideshow_number=None):
+    def __init__(self, slideshow_number=None, edit_journal=None):
         """
         Sets up Keynote so that it uses whichever slideshow throughout
+        edit_journal keeps edits made during play on disk until they're sent, see editqueue.py
         """
         AppleScriptWrapper.__init__(self, "Keynote")
         if not slideshow_number:
             slideshow_number = 1
 
-        self._edit = []
+        self.edits = EditQueue(edit_journal)
+        if self.edits and not self.playing():
+            self.do_edits_now()   # left over from last time
         """
         The following line shouldn't be there because it uses system_events, but it's assumed
         """
@@ -57,20 +111,63 @@ class Klass(AppleScriptWrapper):
         return self.path().split('/')
 
     def count_of_slides_in_slideshow(self, slideshow):
-        return self.get_app().slideshows[slideshow].count(each=k.slide)
+        return self.get_app().slideshows[slideshow].count(each=self.k('slide'))
 
     def count_of_slides_in_current_slideshow(self):
-        return self.current_slideshow().count(each=k.slide)
+        return self.current_slideshow().count(each=self.k('slide'))
+
+    def iter_slides(self, slideshow=None, fields=('slide_number', 'title', 'body'), chunk_size=100):
+        """
+        Yields a record (see snapshot.py) of fields for each slide of slideshow (number or name, None for the current one)
+        Slides are fetched chunk_size at a time, each chunk in one request for all fields (or one per field if need be),
+        so a deck of 300 slides is a handful of requests rather than one or two per slide
+        """
+        from AppleScriptWrapper.snapshot import snapshot_elements
+        show = self.current_slideshow() if slideshow is None else self.application.slideshows[slideshow]
+        total = show.count(each=self.k('slide'))
+        for start in range(1, total + 1, chunk_size):
+            stop = min(total, start + chunk_size - 1)
+            for record in snapshot_elements(show.slides[start:stop], fields, self.backend):
+                yield record
+
+    def export_slides(self, path, slideshow=None, fields=('slide_number', 'title', 'body', 'notes'), format=None, chunk_size=100):
+        """
+        Writes the text of every slide to path (or an open file) as CSV, or as JSON lines if format is 'jsonl'
+        format defaults to whatever path's extension says, and to CSV otherwise; returns the number of slides written
+        """
+        import csv
+        import json
+        from AppleScriptWrapper.jsonable import jsonable
+        if format is None:
+            format = 'jsonl' if isinstance(path, str) and path.endswith(('.jsonl', '.json')) else 'csv'
+        if format not in ('csv', 'jsonl'):
+            raise ValueError("Can export slides as csv or jsonl, not {0}".format(format))
+        f = open(path, 'w', newline='', encoding='utf-8') if isinstance(path, str) else path
+        try:
+            if format == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(fields)
+            written = 0
+            for record in self.iter_slides(slideshow, fields, chunk_size):
+                if format == 'csv':
+                    writer.writerow(["" if value is None else value for value in record.values()])
+                else:
+                    f.write(json.dumps(jsonable(record.as_dict())) + "\n")
+                written += 1
+        finally:
+            if f is not path:
+                f.close()
+        return written
 
     def derive_num_from_slide_ref(self, slideref):
         which = str(slideref)
         where = re.findall(r'\[([0-9]+)\]', which)
         if not where:
             output("Warning, could not get slide number")
-        return int(where[0])
+        return int(where[-1])
 
     def current_slide_num(self):
-        return self.derive_num_from_slide_ref(self.current_slide())
+        return self.derive_num_from_slide_ref(self.current_slide().get())
 
     def get_slide_reference(self, slide_number):
         return self.application.slideshows.slides[slide_number]
@@ -107,24 +204,46 @@ class Klass(AppleScriptWrapper):
 
     def set_titleorbody_of_slide(self, _property_, slide_number, _new_):
         """
-        If keynote is not in editing mode, will put request into self._edit_when_can
-        Works in tandem with self.can_edit_now() which is called when stop_slideshow is called
+        If keynote is not in editing mode, will put request into self.edits, for the current slideshow
+        Works in tandem with self.do_edits_now() which is called when stop_slideshow is called
         """
+        if _property_ not in ["title", "body"]:
+            raise Exception("Passed {0} crap to set_titleorbody_of_slide".format(str(_property_)))
         if self.playing():
-            self._edit.append( (_property_, slide_number, _new_) )
+            self.edits.put(self.remembered('name', self.current_slideshow().name), slide_number, _property_, _new_)
             
         else:
-            if _property_ not in ["title", "body"]:
-                raise Exception("Passed {0} crap to set_titleorbody_of_slide".format(str(_property_)))
-            reference = getattr(self.get_slide_reference(slide_number), _property_)
-            reference.set(_new_)
+            self._set_titleorbody_of_slide(_property_, slide_number, _new_)
+
+    def _set_titleorbody_of_slide(self, _property_, slide_number, _new_):
+        if _property_ not in ["title", "body"]:
+            raise Exception("Passed {0} crap to set_titleorbody_of_slide".format(str(_property_)))
+        reference = getattr(self.get_slide_reference(slide_number), _property_)
+        return self.send(reference.set, _new_)
 
     def do_edits_now(self):
-        if self._edit:
-            for request in self._edit:
-                property, slide_num, s = request
-                self.set_titleorbody_of_slide(property, slide_num, s)
-            self._edit = []
+        """
+        Sends the edits saved up during play in one batch, slideshow by slideshow and slide by slide
+        Returns a list of ((slideshow, slide, property), exception) for any that failed, which are dropped all the same
+        """
+        pending = self.edits.ordered()
+        if not pending:
+            return []
+        sent = []
+        with self.batch():
+            slideshow = slide = None
+            for (name, slide_number, property), value in pending:
+                if slideshow is None or name != slideshow[0]:
+                    slideshow = (name, self.application.slideshows[name])
+                    slide = None
+                if slide is None or slide_number != slide[0]:
+                    slide = (slide_number, slideshow[1].slides[slide_number])
+                sent.append(((name, slide_number, property), value, self.send(getattr(slide[1], property).set, value)))
+        self.edits.done([(key, value) for key, value, future in sent])
+        failed = [(key, future.exception()) for key, value, future in sent if future.exception() is not None]
+        for key, error in failed:
+            output("Couldn't make edit {0}: {1}".format(key, error))
+        return failed
 
     def set_title_of_slide(self, slide_number, _new_title_):
         """ See above """
@@ -143,6 +262,7 @@ class Klass(AppleScriptWrapper):
 
     def start(self):
         self.application.start()
+        self._mutated()
 
     def start_from_slide(self, slide_number):
         """
@@ -150,12 +270,15 @@ class Klass(AppleScriptWrapper):
         Prevents applescript error by checking to see that I'm playing first
         """
         self.application.start_from(self.get_slide_reference(slide_number))
+        self._mutated()
 
     def advance(self):
         self.get_app().advance()
+        self._mutated()
 
     def stop_slideshow(self):
         self.get_app().stop_slideshow()
+        self._mutated()
         self.do_edits_now()
 
     def jump_to_slide(self, slide_number):
@@ -163,6 +286,7 @@ class Klass(AppleScriptWrapper):
         Jumps to slide, without transitions
         """
         self.application.jump_to(self.get_slide_reference(slide_number))
+        self._mutated()
 
     def show_slide(self, slide_number):
         """ Alias for above """
@@ -174,6 +298,7 @@ class Klass(AppleScriptWrapper):
         One benefit I would get from checking is that I don't have to delete the legend every ferking time
         """
         self.get_slide_reference(slide_number).add_chart(row_names=row_names, column_names=column_names, data=data, type=type, group_by=group_by)
+        self._mutated()
         self.wait()
         self.keystroke("D", command_down=True)
 
@@ -189,14 +314,16 @@ class Klass(AppleScriptWrapper):
                        **kwargs)
 
     def playing_and_frontmost(self):
-        return self.playing() and self.frontmost()
+        state = self.snapshot(self.application, ['playing', 'frontmost'])
+        return state.playing and state.frontmost
 
     def is_frozen(self):
-        return self.get_app().frozen()
+        return self.remembered('frozen', self.get_app().frozen)
 
     def is_playing(self):
-        return self.application.playing()
+        return self.remembered('playing', self.application.playing)
 
+    @span()
     def move_slide(self, this_slideshow, this_slide_num, to_slideshow, to_num):
         """
         Move the slide defined at this_slide so that it is now the slide defined by to_ parameters
@@ -211,7 +338,26 @@ class Klass(AppleScriptWrapper):
         else:
             to_where = to_where.slides[to_num-1].after
         self.get_app().slideshows[this_slideshow].slides[this_slide_num].move(to=to_where)
+        self._mutated()
 
+    @span()
+    def reorder_slides(self, slideshow, new_order):
+        """
+        Puts the slides of slideshow (number or name, None for the current one) in new_order, a list of the
+        current slide numbers in the order wanted, eg [3, 1, 2]; see plan_reorder
+        Only slides that have to move are moved, all in one batch, and the number of moves is returned
+        """
+        show = self.current_slideshow() if slideshow is None else self.application.slideshows[slideshow]
+        total = show.count(each=self.k('slide'))
+        if len(new_order) != total:
+            raise ValueError("new_order has {0} slides but the slideshow has {1}".format(len(new_order), total))
+        moves = plan_reorder(new_order)
+        with self.batch():
+            for position, anchor, where in moves:
+                self.send(show.slides[position].move, to=getattr(show.slides[anchor], where))
+        return len(moves)
+
+    @span()
     def import_foreign_slide(self, foreign_slideshow, foreign_slide_num):
         """
         Takes a slide specified in slide_num and slideshow_name and puts it so that it appears wherever we are in the slideshow
@@ -254,62 +400,79 @@ class Klass(AppleScriptWrapper):
             except CalledFunctionAssumingPlayModeButNotPlaying as err:
                 output("Exception CalledFunctionAssumingPlayModeButNotPlaying raised with message: {0}".format(err.args))
 
-    def detect_slide_change(self):
+    def slide_monitor(self, **kwargs):
         """
-        Returns a dictionary {'advanced':ref} where ref is a reference to the slide that was advanced to
+        SlideMonitor for this presentation, which calls back when slides change or play starts or stops
+        See slidewatch.py for the keyword arguments
         """
-        ____verbose = True
+        from AppleScriptWrapper.slidewatch import SlideMonitor
+        return SlideMonitor(self, **kwargs)
 
-        current_slide = self.current_slide()
-        play_state = self.playing()
+    def detect_slide_change(self):
+        """
+        Yields a dictionary {'change':difference, 'slide_ref':ref} each time the slide changes while playing and frontmost,
+        where ref is a reference to the slide that was advanced to, then {'play_state_changed':False} if play stopped
+        """
+        ____verbose = False
 
-        ____verbose and output('Entered detect_slide_change and current_slide is {0}, and play state is {1}'.format(current_slide, play_state))
-
-        while self.playing_and_frontmost():
-            ____verbose and output('Inside the loop while self.playing_and_frontmost')
-            self.wait()
-            new_current_slide = self.current_slide()
-            if new_current_slide != current_slide: 
-                ____verbose and output('Decided that we have come across a new page')
-                old_slide = current_slide
-                current_slide = new_current_slide
-                page_difference = self.derive_num_from_slide_ref(new_current_slide) - self.derive_num_from_slide_ref(old_slide)
-                ____verbose and output('About to yield the following -- change: {0}, slide_ref: {1}'.format(page_difference, current_slide))
-                yield {'change':page_difference,
-                       'slide_ref':current_slide}
-            else: yield {}
-        if play_state != self.playing():
+        from AppleScriptWrapper.slidewatch import SLIDE_CHANGED
+        monitor = self.slide_monitor()
+        for event in monitor.events(while_=lambda state: state.playing and state.frontmost):
+            if event.kind == SLIDE_CHANGED:
+                ____verbose and output('Slide changed by {0} to {1}, noticed within {2:.0f}ms'.format(event.change, event.slide, event.latency * 1000))
+                yield {'change':event.change,
+                       'slide_ref':self.get_slide_reference(event.slide)}
+        if monitor.baseline.playing and not monitor.state.playing:
             ____verbose and output('Decided that the play stage has changed and about to yield play_state: False')
             yield {'play_state_changed':False}
 
-    def detect_play_or_edit(self):
-        ____verbose = False
-        
-        play_state = self.playing()
-        slide_num = self.current_slide_num()
-        slide_title, slide_body = self.get_title_of_slide(slide_num), self.get_body_of_slide(slide_num)
+    async def adetect_slide_change(self):
+        """
+        detect_slide_change as an async iterator: async for change in keynote.adetect_slide_change()
+        Yields the same dictionaries; the SlideMonitor's probes run on the pool, and the loop is free between them
+        """
+        from AppleScriptWrapper import aio
+        from AppleScriptWrapper.slidewatch import SLIDE_CHANGED
+        import asyncio
+
+        monitor = self.slide_monitor()
+        monitor.state = monitor.baseline = await aio.run(self, monitor.probe)
+        while monitor.state.playing and monitor.state.frontmost:
+            await asyncio.sleep(monitor.interval)
+            for event in monitor.update(await aio.run(self, monitor.probe)):
+                if event.kind == SLIDE_CHANGED:
+                    yield {'change':event.change,
+                           'slide_ref':self.get_slide_reference(event.slide)}
+        if monitor.baseline.playing and not monitor.state.playing:
+            yield {'play_state_changed':False}
 
-        while not self.playing_and_frontmost():
-            ____verbose and output('Inside detect_play\' loop, with the following items:\nplay state is {0}\nslide num is {1}\nslide title is {2}\nslide body is {3}'.format(play_state, slide_num, slide_title, slide_body))
-            self.wait()
-            messages = {}
+    def current_slide_state(self):
+        """ (slide number, title, body) of the current slide, in one request """
+        content = self.snapshot(self.current_slide(), ['slide_number', 'title', 'body'])
+        return content.slide_number, (content.title or "").strip(), (content.body or "").strip()
 
-            if self.current_slide_num() == slide_num: 
-                modified = (self.get_title_of_slide(slide_num) != slide_title) or (self.get_body_of_slide(slide_num) != slide_body)
-                if modified:
-                    messages['modified'] = True
-                    messages['slide_ref'] = self.current_slide()
-                    ____verbose and output('Decided that the user has MODIFIED the slide')
-                    slide_title, slide_body = self.get_title_of_slide(slide_num), self.get_body_of_slide(slide_num)
-                else:
-                    ____verbose and output('Decided that the user has NOT modified the slide')
-            else:
-                ____verbose and output('Decided that the user has simply changed slides, update state and that is it')
-                slide_num = self.current_slide_num()
-                slide_title, slide_body = self.get_title_of_slide(slide_num), self.get_body_of_slide(slide_num)
+    def slide_content_tracker(self, **kwargs):
+        """ SlideContentTracker for this presentation, which notices edits to slides, see slidewatch.py """
+        from AppleScriptWrapper.slidewatch import SlideContentTracker
+        return SlideContentTracker(self, **kwargs)
 
-            ____verbose and output('About to yield this: {0}'.format(messages))
-            yield messages
+    def detect_play_or_edit(self, play_check_every=4):
+        """
+        While editing, yields {'modified':True, 'slide_ref':ref, 'fields':[...]} each time the text of the current slide changes,
+        then {'slide_ref':ref, 'play_state_changed':True} once the slideshow is played
+        Each wait is one request: play is checked for every play_check_every waits, in place of that wait's content check
+        """
+        ____verbose = False
+        
+        play_state = self.playing()
+        tracker = self.slide_content_tracker()
+
+        for change in tracker.watch(interval=self._wait, while_=lambda: not self.playing_and_frontmost(),
+                                    while_every=play_check_every):
+            ____verbose and output('Decided that the user has MODIFIED the {0} of slide {1}'.format(change.fields, change.slide))
+            yield {'modified': True,
+                   'slide_ref': change.reference,
+                   'fields': list(change.fields)}
 
         if play_state != self.playing():
             messages = {}
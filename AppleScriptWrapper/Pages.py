@@ -42,7 +42,7 @@ class Klass(AppleScriptWrapper):
 
     def append(self, what):
         cur = self.current_document()
-        cur.make(at=cur.body_text.end, new=self.k('word'), with_data=what)
+        return self.send(cur.make, at=cur.body_text.end, new=self.k('word'), with_data=what)
 
     def surrounding_text_of_selection(self, offset=40):
         sel = self.selection()
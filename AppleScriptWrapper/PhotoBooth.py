@@ -31,13 +31,7 @@ class Klass(AppleScriptWrapper):
         Appropriate to call after taking a photo, as this is the built-in behavior
         Avoids infinite loop by not going past a half-minute.
         """
-        ref = None
-        self.start_timer()
-        while not ref:
-            ref = self.menu_item_enabled('File', 'Take Photo')
-            if self.elapsed_time_since_start() > 0.5:
-                ref = True
-        self.stop_timer()
+        return self.wait_until(lambda: self.menu_item_enabled('File', 'Take Photo', live=True), timeout=30)
 
 if __name__ == '__main__':
 
@@ -6,7 +6,6 @@ Works with classes or dictionaries
 """
 
 from AppleScriptWrapper.Basic import AppleScriptWrapper
-import mactypes
 import os
 import re
 import collections
@@ -11,21 +11,22 @@ class Klass(AppleScriptWrapper):
     def current_movie(self):
         return self.application.documents[0]
 
-    def back_to_beginning(self):
+    def back_to_beginning(self, timeout=10):
         """
         Gets us back to the beginning of the movie, no matter how long
+        Rewinds once and then waits for current time to get there, raising WaitTimeout if it doesn't within timeout seconds
         """
-        while not int(self.current_time()) == 0:
-            self.step_backward(by=10000)
+        movie = self.current_movie()   # asked directly, so as not to be answered from the memo
+        self.send(movie.current_time.set, 0)
+        return self.wait_until(lambda: int(movie.current_time()) == 0, timeout=timeout, interval=0.01, max_interval=0.1,
+                               raise_on_timeout=True)
 
     def movie_finished(self):
         try:
-            m = self.documents[0]()
-        except:
-            return True
-        t = self.current_time()
-        d = self.duration()
-        return t >= d
+            movie = self.snapshot(self.current_movie(), ['current_time', 'duration'])
+        except Exception:
+            return True   # no movie open
+        return movie.current_time >= movie.duration
 
     def full_screen(self):
         self.present()
@@ -1 +1,19 @@
 __version__ = '0.5.6'
+
+# Nothing is imported until it's asked for: AppleScriptWrapper.Keynote, AppleScriptWrapper.get_app, etc.
+# load the module then, and appscript itself waits until the first wrapper is made (see backend.py)
+
+_lazy = {'get_app': 'Basic', 'use_backend': 'Basic', 'AppleScriptWrapper': 'Basic'}
+
+def __getattr__(name):
+    import importlib
+    if name in _lazy:
+        return getattr(importlib.import_module('AppleScriptWrapper.' + _lazy[name]), name)
+    if name.startswith('_'):
+        raise AttributeError(name)
+    try:
+        return importlib.import_module('AppleScriptWrapper.' + name)
+    except ModuleNotFoundError as e:
+        if e.name != 'AppleScriptWrapper.' + name:
+            raise   # the module is there but something it needs isn't
+        raise AttributeError("module 'AppleScriptWrapper' has no attribute {0!r}".format(name))
@@ -1 +1,75 @@
-print("version: 0.5.1")
+"""
+python -m AppleScriptWrapper                            prints the version
+python -m AppleScriptWrapper prewarm [app ...]          dumps terminology for the apps (default: every app the package wraps)
+python -m AppleScriptWrapper serve [--warm app ...]     runs the server, see server.py
+python -m AppleScriptWrapper call app method [arg ...]  asks the server to do something, args are JSON (or plain strings)
+python -m AppleScriptWrapper run [file] [--parallel]    runs a runbook of JSON lines commands, see runner.py
+"""
+
+import sys
+import json
+import argparse
+
+def prewarm(args):
+    from AppleScriptWrapper.Basic import AppRegistry
+    from AppleScriptWrapper.terminology import terminology_cache
+    names = args.apps or sorted(AppRegistry.modules) + ['System Events']
+    for name, path in sorted(terminology_cache.prewarm(names).items()):
+        print("{0:<20} {1}".format(name, path or "not cached"))
+
+def serve(args):
+    from AppleScriptWrapper.server import serve
+    serve(args.socket, warm=args.warm, fake=args.fake)
+
+def call(args):
+    from AppleScriptWrapper.client import Client, RemoteError
+    values = []
+    for arg in args.args:
+        try:
+            values.append(json.loads(arg))
+        except ValueError:
+            values.append(arg)
+    try:
+        with Client(args.socket) as client:
+            print(json.dumps(client.call(args.app, args.method, *values)))
+    except RemoteError as e:
+        sys.exit(str(e))
+
+def run(args):
+    from AppleScriptWrapper.runner import run
+    sys.exit(run(args.file, parallel=args.parallel, ordered=args.ordered, stop_on_error=args.stop_on_error, fake=args.fake))
+
+def main(argv=None):
+    from AppleScriptWrapper import __version__
+    from AppleScriptWrapper.client import SOCKET_PATH
+    parser = argparse.ArgumentParser(prog='python -m AppleScriptWrapper')
+    commands = parser.add_subparsers(dest='command')
+    command = commands.add_parser('prewarm', help="cache the terminology of apps on disk")
+    command.add_argument('apps', nargs='*', help="app names, default every app the package wraps")
+    command.set_defaults(run=prewarm)
+    command = commands.add_parser('serve', help="keep wrappers warm and answer requests on a Unix socket")
+    command.add_argument('--socket', default=SOCKET_PATH)
+    command.add_argument('--warm', nargs='*', default=[], metavar='APP', help="apps to get ready before the first request")
+    command.add_argument('--fake', action='store_true', help="serve the in-memory fake backend")
+    command.set_defaults(run=serve)
+    command = commands.add_parser('call', help="send one request to the server")
+    command.add_argument('--socket', default=SOCKET_PATH)
+    command.add_argument('app')
+    command.add_argument('method')
+    command.add_argument('args', nargs='*')
+    command.set_defaults(run=call)
+    command = commands.add_parser('run', help="run commands read as JSON lines, writing results as JSON lines")
+    command.add_argument('file', nargs='?', help="default stdin")
+    command.add_argument('--parallel', action='store_true', help="run different apps' commands at the same time")
+    command.add_argument('--ordered', action='store_true', help="write results in the order the commands came")
+    command.add_argument('--stop-on-error', action='store_true')
+    command.add_argument('--fake', action='store_true', help="run against the in-memory fake backend")
+    command.set_defaults(run=run)
+    args = parser.parse_args(argv)
+    if args.command is None:
+        print("version: {0}".format(__version__))
+        return
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
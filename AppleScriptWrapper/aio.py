@@ -0,0 +1,112 @@
+"""
+asyncio facade: drive several apps from one event loop
+
+    keynote, safari = get_app('Keynote'), get_app('Safari')
+    title, name = await asyncio.gather(keynote.acall('get_title_of_slide', 2),
+                                       safari.acall('name_of_current_document'))
+    async for change in keynote.adetect_slide_change():
+        ...
+
+The blocking calls run on one bounded thread pool shared by every wrapper (see set_max_workers), not a thread each
+Calls on the same wrapper wait their turn in the event loop, as the app would handle them one at a time anyway,
+so the pool's threads are only ever busy sending events
+"""
+
+import asyncio
+import functools
+import threading
+import time
+import random
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+_locks = weakref.WeakKeyDictionary()   # wrapper -> {event loop: asyncio.Lock}
+
+def executor():
+    """ The shared pool, started the first time it is needed """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='AppleScriptWrapper')
+        return _executor
+
+def set_max_workers(n):
+    """ Resize the pool; calls already running finish on the old one """
+    global MAX_WORKERS, _executor
+    with _executor_lock:
+        MAX_WORKERS = n
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=False)
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=wait)
+
+def _lock_for(wrapper):
+    loop = asyncio.get_running_loop()
+    per_loop = _locks.get(wrapper)
+    if per_loop is None:
+        per_loop = _locks[wrapper] = weakref.WeakKeyDictionary()
+    lock = per_loop.get(loop)
+    if lock is None:
+        lock = per_loop[loop] = asyncio.Lock()
+    return lock
+
+async def run(wrapper, function, *args, **kwargs):
+    """ Runs function(*args, **kwargs) on the pool, one at a time for each wrapper """
+    loop = asyncio.get_running_loop()
+    async with _lock_for(wrapper):
+        return await loop.run_in_executor(executor(), functools.partial(function, *args, **kwargs))
+
+async def call(wrapper, method, *args, **kwargs):
+    """
+    method is a callable, or the name of something the wrapper can do (anything wrapper.method would find)
+    A name is looked up on the pool too, as finding it the first time can mean asking the app
+    """
+    if not callable(method):
+        return await run(wrapper, wrapper.call_by_name, method, *args, **kwargs)
+    return await run(wrapper, method, *args, **kwargs)
+
+async def wait_until(wrapper, predicate, timeout=30, interval=0.05, max_interval=1.0, backoff=1.5, jitter=0.1,
+                     cancel=None, raise_on_timeout=False):
+    """
+    Like wrapper.wait_until, but awaits between probes instead of sleeping, so the loop gets on with other things
+    predicate runs on the pool; cancel can be an asyncio.Event or a threading.Event
+    """
+    from AppleScriptWrapper.Basic import WaitReport, WaitTimeout
+    report = WaitReport()
+    start = time.time()
+    deadline = None if timeout is None else start + timeout
+    delay = interval
+    while True:
+        report.probes += 1
+        value = await run(wrapper, predicate)
+        if value:
+            report.satisfied = True
+            report.value = value
+            break
+        now = time.time()
+        if deadline is not None and now >= deadline:
+            report.timed_out = True
+            break
+        if cancel is not None and cancel.is_set():
+            report.cancelled = True
+            break
+        sleep = delay * (1 + random.uniform(-jitter, jitter))
+        if deadline is not None:
+            sleep = min(sleep, deadline - now)
+        await asyncio.sleep(max(0, sleep))
+        delay = min(max_interval, delay * backoff)
+    report.elapsed = time.time() - start
+    wrapper.last_wait = report
+    if report.timed_out and raise_on_timeout:
+        raise WaitTimeout(report)
+    return report
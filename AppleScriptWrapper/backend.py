@@ -0,0 +1,72 @@
+"""
+The scripting bridge that the wrappers talk through
+
+AppscriptBackend, the real thing, is used unless another backend is installed, for example the in-memory
+fakebackend.FakeBackend for running the wrappers where there is no Mac. A backend provides:
+
+   app(name)                   application reference, like appscript.app(name)
+   osax(name=None)             Standard Additions, like osax.OSAX(name=name)
+   alias(path)                 file alias, like mactypes.Alias(path); Alias is the class
+   k, its, CommandError        as in appscript
+   is_missing_reference(e)     whether e is AppleScript's "Can't get reference" (-1728)
+   is_reference(value)         whether value is a reference to something in an app, rather than a command or a value
+
+Use Basic.use_backend(backend) to switch, it also forgets wrappers made with the old one
+"""
+
+class AppscriptBackend(object):
+    name = 'appscript'
+
+    def __init__(self, terminology=True):
+        """ terminology: a terminology.TerminologyCache, True for the shared one, or None not to cache """
+        import appscript
+        import osax
+        import mactypes
+        from appscript.reference import CommandError
+        self._appscript = appscript
+        self._osax = osax
+        self.k = appscript.k
+        self.its = appscript.its
+        self.Alias = mactypes.Alias
+        self.CommandError = CommandError
+        if terminology is True:
+            from AppleScriptWrapper.terminology import terminology_cache as terminology
+        self.terminology = terminology or None
+
+    def app(self, name):
+        """ Terminology comes from the disk cache when it can, see terminology.py """
+        terms = self.terminology.terms_for(name) if self.terminology is not None else None
+        if terms is None:
+            return self._appscript.app(name)
+        return self._appscript.app(name, terms=terms)
+
+    def osax(self, name=None):
+        if name is None:
+            return self._osax.OSAX()
+        return self._osax.OSAX(name=name)
+
+    def alias(self, path):
+        return self.Alias(path)
+
+    def is_missing_reference(self, error):
+        errornumber = getattr(error, 'errornumber', None)
+        if errornumber is not None:
+            return errornumber == -1728
+        return len(error.args) > 2 and str(error.args[2]) == "Command failed: Can't get reference. (-1728)"
+
+    def is_reference(self, value):
+        return isinstance(value, self._appscript.reference.Reference)
+
+_backend = None
+
+def get_backend():
+    """ The backend in use, AppscriptBackend unless set_backend has been called """
+    global _backend
+    if _backend is None:
+        _backend = AppscriptBackend()
+    return _backend
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+    return backend
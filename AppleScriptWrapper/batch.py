@@ -0,0 +1,155 @@
+"""
+Batched commands: inside "with wrapper.batch():" commands are recorded instead of sent,
+then compiled into one BatchScript and run in a single go when the block exits
+
+Every recorded command gives back a Future, which has its result once the batch has run
+
+Use:
+   with keynote.batch():
+       f = keynote.send(keynote.get_slide_reference(3).title.set, "Hello")   # references built by hand
+       g = keynote.start()                                                   # commands routed by the wrapper
+   f.result()
+
+Caveat: anything fetched through the wrapper inside the block is a Future too, so don't branch on it
+"""
+
+
+class BatchStep(object):
+    """ One recorded command """
+    def __init__(self, command, args, kwargs, future):
+        self.command = command
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+
+    def render(self):
+        params = [repr(a) for a in self.args] + ["{0}={1!r}".format(key, value) for key, value in sorted(self.kwargs.items())]
+        return "{0}({1})".format(self.command, ", ".join(params))
+
+class BatchScript(object):
+    """
+    A compiled batch: the steps in the order they are to be sent, plus whether the app needs activating first
+    Executors take one of these and return a list of (result, exception) pairs, one per step
+    """
+    def __init__(self, app_name, steps, activate):
+        self.app_name = app_name
+        self.steps = steps
+        self.activate = activate
+
+    def __len__(self):
+        return len(self.steps)
+
+    def render(self):
+        """ Readable listing of what will be sent, handy for logging and for checking batches on other platforms """
+        lines = ["tell application {0!r}".format(self.app_name)]
+        if self.activate:
+            lines.append("    activate")
+        lines.extend("    " + step.render() for step in self.steps)
+        lines.append("end tell")
+        return "\n".join(lines)
+
+def run_in_sequence(script, wrapper):
+    """ Default executor: activates once if needed, then sends each step, carrying on past errors """
+    if script.activate:
+        wrapper.auto_activate_now()
+    outcomes = []
+    for step in script.steps:
+        try:
+            outcomes.append((step.command(*step.args, **step.kwargs), None))
+        except Exception as e:
+            outcomes.append((None, e))
+    return outcomes
+
+class RecordingExecutor(object):
+    """
+    Stand-in executor that sends nothing: keeps every script it's given and answers each step with `result`
+    Useful for dry runs, and for checking what a batch would send where there's no Mac to send it to
+    """
+    def __init__(self, result=None):
+        self.scripts = []
+        self.result = result
+
+    def __call__(self, script, wrapper):
+        self.scripts.append(script)
+        return [(self.result, None) for step in script.steps]
+
+class Recorder(object):
+    """ Stands in for a reference handed out by the wrapper during a batch: calling it (or anything under it) records """
+    def __init__(self, batch, reference):
+        self._batch = batch
+        self._reference = reference
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Recorder(self._batch, getattr(self._reference, name))
+
+    def __getitem__(self, key):
+        return Recorder(self._batch, self._reference[key])
+
+    def __call__(self, *args, **kwargs):
+        return self._batch.record(self._reference, *args, **kwargs)
+
+    def __repr__(self):
+        return repr(self._reference)
+
+class Batch(object):
+    """
+    Collects commands for a wrapper while active, see module docstring
+    Nested "with wrapper.batch()" blocks join the outermost one, which is the one that runs
+    """
+    def __init__(self, wrapper, executor=None):
+        self.wrapper = wrapper
+        self.executor = executor or run_in_sequence
+        self.steps = []
+        self.script = None
+        self._depth = 0
+
+    def record(self, command, *args, **kwargs):
+        from concurrent.futures import Future   # not needed until a batch is used, and slow to import
+        future = Future()
+        self.steps.append(BatchStep(command, args, kwargs, future))
+        return future
+
+    def compile(self):
+        return BatchScript(self.wrapper.app_name, list(self.steps), self.wrapper.auto_activate)
+
+    def run(self):
+        """ Sends everything recorded so far and resolves the futures """
+        self.script = self.compile()
+        self.steps = []
+        if not self.script.steps:
+            return self.script
+        try:
+            outcomes = self.executor(self.script, self.wrapper)
+        except Exception as e:
+            outcomes = [(None, e)] * len(self.script.steps)
+        self.wrapper._mutated()   # whatever was remembered before the batch may no longer be so
+        for step, (result, error) in zip(self.script.steps, outcomes):
+            if not step.future.set_running_or_notify_cancel():
+                continue
+            if error is not None:
+                step.future.set_exception(error)
+            else:
+                step.future.set_result(result)
+        return self.script
+
+    def cancel(self):
+        for step in self.steps:
+            step.future.cancel()
+        self.steps = []
+
+    def __enter__(self):
+        self._depth += 1
+        self.wrapper._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self._depth -= 1
+        if self._depth:
+            return
+        self.wrapper._batch = None
+        if exc_type is None:
+            self.run()
+        else:
+            self.cancel()
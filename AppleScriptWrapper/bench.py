@@ -0,0 +1,136 @@
+"""
+Benchmarks for the wrappers, run against fakebackend.FakeBackend so that they work anywhere
+
+    python -m AppleScriptWrapper.bench [--latency SECONDS] [--repeat N]
+    python -m AppleScriptWrapper.bench --imports [--budget MS]
+
+Runs a typical call or two on every Klass in the package, with a simulated round trip of `latency` seconds,
+and reports how many events each one sends and how long it takes, the first time and once warmed up
+
+--imports instead times importing the package's modules (python -X importtime, in a fresh interpreter each),
+and fails if any goes over budget or pulls in something that should wait until it's used, see HEAVY_MODULES
+"""
+
+import io
+import os
+import sys
+import subprocess
+import time
+import argparse
+import contextlib
+
+def _scenarios():
+    """ (app name, label, function of the wrapper) """
+    return [
+        ('Keynote', 'get_title_of_slide', lambda k: k.get_title_of_slide(2)),
+        ('Keynote', 'set_title_of_slide', lambda k: k.set_title_of_slide(2, "Title")),
+        ('Keynote', 'current_slide_num', lambda k: k.current_slide_num()),
+        ('Keynote', 'save_gui_state', lambda k: k.save_gui_state()),
+        ('Finder', 'spotlight_add_comment', lambda f: f.spotlight_add_comment('/tmp/a.txt', 'bench')),
+        ('Finder', 'rename', lambda f: f.rename('/tmp/b.txt', 'b.txt')),
+        ('Pages', 'append', lambda p: p.append('word ')),
+        ('TextEdit', 'append', lambda t: t.append('word ')),
+        ('TextEdit', 'file_is_open', lambda t: t.file_is_open('Untitled.txt')),
+        ('QuickTime Player', 'movie_finished', lambda q: q.movie_finished()),
+        ('Photo Booth', 'wait_for_take_photo', lambda p: p.wait_for_take_photo()),
+        ('ProVoc', 'export_for_moodle', lambda p: p.export_for_moodle()),
+        ('ProVoc', 'saved', lambda p: p.saved()),
+        ('Preview', 'click_menu_item', lambda p: p.click_menu_item('Window', 'Zoom')),
+        ('Safari', 'name_of_current_document', lambda s: s.name_of_current_document()),
+        ('Microsoft Word', 'frontmost', lambda w: w.frontmost()),
+        ('iTunes', 'frontmost', lambda i: i.frontmost()),
+        ('Firefox', 'name_of_current_document', lambda f: f.name_of_current_document()),
+        ('System Preferences', 'frontmost', lambda s: s.frontmost()),
+    ]
+
+def bench_klasses(latency=0.001, repeat=5, out=sys.stdout):
+    """
+    Returns a list of dicts (app, call, first_events, first_ms, events, ms, error) and prints a table to out
+    events and ms are per call once warmed up (route cache filled, etc)
+    """
+    from AppleScriptWrapper.Basic import use_backend, get_app
+    from AppleScriptWrapper.fakebackend import FakeBackend
+    fake = use_backend(FakeBackend(latency=latency))
+    results = []
+    for app_name, label, call in _scenarios():
+        row = {'app': app_name, 'call': label, 'error': None}
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):   # the wrappers like to chat
+                wrapper = get_app(app_name)
+                wrapper.pacer = None
+                wrapper._wait = 0
+                timings = []
+                for i in range(repeat + 1):
+                    fake.reset_events()
+                    start = time.time()
+                    call(wrapper)
+                    timings.append((len(fake.events), (time.time() - start) * 1000))
+            row['first_events'], row['first_ms'] = timings[0]
+            steady = timings[1:] or timings
+            row['events'] = sum(t[0] for t in steady) / float(len(steady))
+            row['ms'] = sum(t[1] for t in steady) / float(len(steady))
+        except Exception as e:
+            row['error'] = "{0}: {1}".format(type(e).__name__, e)
+        results.append(row)
+    if out is not None:
+        out.write("{0:<20} {1:<26} {2:>8} {3:>10} {4:>8} {5:>10}\n".format(
+            'app', 'call', 'events', 'ms', 'warm ev', 'warm ms'))
+        for row in results:
+            if row['error']:
+                out.write("{0:<20} {1:<26} {2}\n".format(row['app'], row['call'], row['error']))
+            else:
+                out.write("{app:<20} {call:<26} {first_events:>8} {first_ms:>10.2f} {events:>8.1f} {ms:>10.2f}\n".format(**row))
+    return results
+
+IMPORT_MODULES = ('AppleScriptWrapper', 'AppleScriptWrapper.Basic', 'AppleScriptWrapper.Keynote', 'AppleScriptWrapper.Finder')
+HEAVY_MODULES = ('appscript', 'osax', 'mactypes', 'aem', 'asyncio', 'concurrent.futures', 'json', 'glob', 'copy', 'atexit')
+IMPORT_BUDGET_MS = 30.0
+
+def _import_time(module, repeat):
+    """ Best cumulative import time in ms over repeat fresh interpreters, and the heavy modules it imported """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_dir, os.environ.get('PYTHONPATH')])))
+    best, heavy = None, set()
+    for i in range(repeat):
+        err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                             env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+        total = None
+        for line in err.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+            if name == module:
+                total = int(cumulative) / 1000.0
+            if name in HEAVY_MODULES:
+                heavy.add(name)
+        if total is not None and (best is None or total < best):
+            best = total
+    return best, sorted(heavy)
+
+def bench_import(modules=IMPORT_MODULES, budget_ms=IMPORT_BUDGET_MS, repeat=5, out=sys.stdout):
+    """ Returns True if every module imported within budget_ms without any HEAVY_MODULES, printing a table to out """
+    ok = True
+    if out is not None:
+        out.write("{0:<30} {1:>8}  {2}\n".format('module', 'ms', 'heavy imports'))
+    for module in modules:
+        ms, heavy = _import_time(module, repeat)
+        passed = ms is not None and ms <= budget_ms and not heavy
+        ok = ok and passed
+        if out is not None:
+            out.write("{0:<30} {1:>8.2f}  {2}{3}\n".format(module, ms or 0, ", ".join(heavy) or "-",
+                                                          "" if passed else "   FAIL"))
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the wrappers against the fake backend")
+    parser.add_argument('--latency', type=float, default=0.001, help="simulated seconds per event")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--imports', action='store_true', help="time importing the package instead")
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help="ms each module may take to import")
+    args = parser.parse_args(argv)
+    if args.imports:
+        sys.exit(0 if bench_import(budget_ms=args.budget, repeat=args.repeat) else 1)
+    bench_klasses(latency=args.latency, repeat=args.repeat)
+
+if __name__ == '__main__':
+    main()
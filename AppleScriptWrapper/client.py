@@ -0,0 +1,106 @@
+"""
+Client for server.py, light enough to start in a few milliseconds (it imports nothing else from the package)
+
+    from AppleScriptWrapper.client import tell_app_to_do
+    tell_app_to_do('Keynote', 'get_title_of_slide', 2)
+
+    with Client() as c:
+        c.call('Finder', 'reveal', '/tmp')
+        c.stats()
+
+Errors from the other end are raised as RemoteError
+"""
+
+import os
+import json
+import socket
+import itertools
+
+SOCKET_PATH = os.environ.get('APPLESCRIPTWRAPPER_SOCKET',
+                             os.path.join(os.path.expanduser('~'), '.AppleScriptWrapper', 'server.sock'))
+
+class RemoteError(Exception):
+    """ args are (type name, message); number is the Apple Event error number, if there was one """
+    def __init__(self, error):
+        Exception.__init__(self, error.get('type'), error.get('message'))
+        self.type = error.get('type')
+        self.number = error.get('number')
+
+    def __str__(self):
+        return "{0}: {1}".format(self.type, self.args[1])
+
+class ServerNotRunning(Exception): pass
+
+class Client(object):
+
+    def __init__(self, path=SOCKET_PATH, timeout=None):
+        self.path = path
+        self.timeout = timeout
+        self._socket = None
+        self._file = None
+        self._ids = itertools.count(1)
+        self.last_ms = None   # how long the server took over the last request
+
+    def connect(self):
+        if self._socket is None:
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            s.settimeout(self.timeout)
+            try:
+                s.connect(self.path)
+            except (socket.error, OSError) as e:
+                s.close()
+                raise ServerNotRunning("No server on {0} ({1}), start one with: python -m AppleScriptWrapper serve".format(self.path, e))
+            self._socket = s
+            self._file = s.makefile('rb')
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+            self._socket = self._file = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+    def request(self, request):
+        """ Sends a request dict, returns the response's result or raises RemoteError """
+        self.connect()
+        request['id'] = next(self._ids)
+        self._socket.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise ServerNotRunning("The server hung up")
+        response = json.loads(line.decode('utf-8'))
+        self.last_ms = response.get('ms')
+        if not response.get('ok'):
+            raise RemoteError(response.get('error', {}))
+        return response.get('result')
+
+    def call(self, app_name, method, *args, **kwargs):
+        return self.request({'app': app_name, 'method': method, 'args': list(args), 'kwargs': kwargs})
+
+    def ping(self):
+        return self.request({'op': 'ping'})
+
+    def stats(self):
+        return self.request({'op': 'stats'})
+
+    def shutdown(self):
+        return self.request({'op': 'shutdown'})
+
+def k(name):
+    """ Keyword argument for a call, like appscript's k.name """
+    return {'$k': name}
+
+def alias(path):
+    return {'$alias': path}
+
+def tell_app_to_do(app_name, command, *args, **kwargs):
+    """ Basic.tell_app_to_do, done by the server """
+    with Client() as client:
+        return client.call(app_name, command, *args, **kwargs)
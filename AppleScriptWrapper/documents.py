@@ -0,0 +1,141 @@
+"""
+Index of an app's open documents, by name and by path, read with one request
+
+    index = textedit.document_index()
+    'Notes.txt' in index                 # open?
+    index.by_path('/Users/me/Notes.txt')
+    index.refresh().opened               # what changed since last time
+
+Names, paths and modified flags of every document come back together (see snapshot.snapshot_elements), so
+finding out whether a file is open costs one request however many documents there are. The index is
+re-read once it's older than its ttl, and each refresh is applied as a diff, which is kept in changes.
+The wrapper also has it re-read after any command it sends that could open or close something (see
+Basic._mutated); commands sent on wrapper.application directly bypass that and are only seen after the ttl
+"""
+
+import time
+
+from AppleScriptWrapper.snapshot import snapshot_elements
+
+class DocumentEntry(object):
+    __slots__ = ('name', 'path', 'modified', 'position', 'reference')
+
+    def __init__(self, name, path, modified, position, reference):
+        self.name = name
+        self.path = path
+        self.modified = modified
+        self.position = position     # 1-based, front document first
+        self.reference = reference   # by name, so it still points at the document if others open or close
+
+    def __repr__(self):
+        return "<DocumentEntry {0!r}{1}>".format(self.name, " (modified)" if self.modified else "")
+
+class DocumentChanges(object):
+    """ What a refresh found: entries opened, closed, and renamed or whose modified flag changed """
+
+    def __init__(self, opened=(), closed=(), changed=()):
+        self.opened = list(opened)
+        self.closed = list(closed)
+        self.changed = list(changed)
+
+    def __bool__(self):
+        return bool(self.opened or self.closed or self.changed)
+
+    def __repr__(self):
+        return "<DocumentChanges opened={0} closed={1} changed={2}>".format(
+            [e.name for e in self.opened], [e.name for e in self.closed], [e.name for e in self.changed])
+
+def _key(row):
+    """ A document is the same one as long as its path (or, while unsaved, its name) is """
+    return row.path or ('name', row.name)
+
+class DocumentIndex(object):
+    """
+    elements is the reference to the documents, eg app('TextEdit').documents
+    backend is the wrapper's backend; ttl is how many seconds an answer is good for (0 to always re-read)
+    """
+    fields = ('name', 'path', 'modified')
+
+    def __init__(self, elements, backend=None, ttl=1.0):
+        self.elements = elements
+        self.backend = backend
+        self.ttl = ttl
+        self.taken = None
+        self.requests = 0
+        self.changes = DocumentChanges()
+        self._entries = {}   # _key -> DocumentEntry
+        self._by_name = {}
+        self._by_path = {}
+
+    def expired(self):
+        if self.taken is None:
+            return True
+        return not self.ttl or time.time() - self.taken > self.ttl
+
+    def invalidate(self):
+        self.taken = None
+
+    def fresh(self):
+        """ self, refreshed first if it has expired """
+        if self.expired():
+            self.refresh()
+        return self
+
+    def refresh(self):
+        """ Re-reads the documents in one request and applies the differences, returns the DocumentChanges """
+        self.requests += 1
+        rows = snapshot_elements(self.elements, self.fields, self.backend)
+        self.taken = time.time()
+        changes = DocumentChanges()
+        seen = {}
+        for position, row in enumerate(rows, 1):
+            key = _key(row)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = DocumentEntry(row.name, row.path, row.modified, position, self.elements[row.name])
+                changes.opened.append(entry)
+            else:
+                entry.position = position   # moving up or down isn't worth reporting
+                if (entry.modified, entry.name) != (row.modified, row.name):
+                    entry.modified = row.modified
+                    if entry.name != row.name:
+                        entry.name, entry.reference = row.name, self.elements[row.name]
+                    changes.changed.append(entry)
+            seen[key] = entry
+        changes.closed = [entry for key, entry in self._entries.items() if key not in seen]
+        if changes:
+            self._entries = seen
+            self._by_name = dict((entry.name, entry) for entry in seen.values())
+            self._by_path = dict((entry.path, entry) for entry in seen.values() if entry.path)
+        self.changes = changes
+        return changes
+
+    def by_name(self, name):
+        """ DocumentEntry for the document called name, or None """
+        return self.fresh()._by_name.get(name)
+
+    def by_path(self, path):
+        return self.fresh()._by_path.get(path)
+
+    def is_open(self, name_or_path):
+        self.fresh()
+        return name_or_path in self._by_name or name_or_path in self._by_path
+
+    __contains__ = is_open
+
+    def entries(self):
+        """ Every DocumentEntry, front document first """
+        return sorted(self.fresh()._entries.values(), key=lambda entry: entry.position)
+
+    def __iter__(self):
+        return iter(self.entries())
+
+    def __len__(self):
+        return len(self.fresh()._entries)
+
+    def names(self):
+        return [entry.name for entry in self.entries()]
+
+    def modified(self):
+        """ Entries with unsaved changes """
+        return [entry for entry in self.entries() if entry.modified]
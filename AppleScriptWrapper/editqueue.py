@@ -0,0 +1,101 @@
+"""
+Edits that can't be made yet, kept until they can
+
+Keynote can't change slides while a slideshow is playing, so Keynote.set_title_of_slide and friends put the
+edit in an EditQueue instead, and do_edits_now sends what's there once play stops. Edits are keyed by
+(slideshow, slide, property): a later edit to the same one replaces the earlier, so only the last value is sent.
+
+With a journal (a path, or True for EDITS_FILE) every change to the queue is written to disk straight away,
+and whatever was pending when the process died is read back in by the next EditQueue using the same journal:
+
+    keynote = Keynote.Klass(edit_journal=True)    # sends edits left over from last time if it can
+"""
+
+import os
+import threading
+import collections
+
+EDITS_FILE = os.path.join(os.path.expanduser('~'), '.AppleScriptWrapper', 'keynote_edits.json')
+
+class EditQueue(object):
+
+    def __init__(self, journal=None):
+        self.journal = EDITS_FILE if journal is True else journal
+        self.coalesced = 0   # edits replaced by a later one before being sent
+        self._edits = collections.OrderedDict()   # (slideshow, slide, property) -> value, last edited last
+        self._lock = threading.Lock()
+        if self.journal:
+            self.load()
+
+    def put(self, slideshow, slide, property, value):
+        key = (slideshow, slide, property)
+        with self._lock:
+            if key in self._edits:
+                del self._edits[key]
+                self.coalesced += 1
+            self._edits[key] = value
+            self._write()
+
+    def ordered(self):
+        """
+        The pending ((slideshow, slide, property), value) pairs, grouped by slideshow and then slide,
+        so each slideshow's and each slide's reference need only be built once
+        """
+        with self._lock:
+            return sorted(self._edits.items(), key=lambda item: tuple(str(part) for part in item[0]))
+
+    def done(self, sent):
+        """ Takes the pairs in sent off the queue, except any edited again since """
+        with self._lock:
+            for key, value in sent:
+                if key in self._edits and self._edits[key] == value:
+                    del self._edits[key]
+            self._write()
+
+    def clear(self):
+        with self._lock:
+            self._edits.clear()
+            self._write()
+
+    def __len__(self):
+        return len(self._edits)
+
+    def __bool__(self):
+        return bool(self._edits)
+
+    def load(self):
+        """ Adds whatever the journal has pending """
+        import json
+        try:
+            with open(self.journal) as f:
+                pending = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        with self._lock:
+            for slideshow, slide, property, value in pending:
+                self._edits[(slideshow, slide, property)] = value
+
+    def _write(self):
+        """ Replaces the journal with what's pending, in one rename so a crash leaves the old one or the new one """
+        if not self.journal:
+            return
+        import json
+        try:
+            directory = os.path.dirname(self.journal)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            if not self._edits:
+                if os.path.exists(self.journal):
+                    os.remove(self.journal)
+                return
+            partial = self.journal + '.partial'
+            with open(partial, 'w') as f:
+                json.dump([list(key) + [value] for key, value in self._edits.items()], f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, self.journal)
+        except (IOError, OSError):
+            pass
+
+    def stats(self):
+        return {'pending': len(self._edits), 'coalesced': self.coalesced, 'journal': self.journal}
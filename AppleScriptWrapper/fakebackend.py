@@ -0,0 +1,841 @@
+"""
+In-memory stand-in for the scripting bridge, so that wrappers can be run and measured without a Mac
+
+Applications are trees of FakeObjects (properties, elements, commands) and references work like appscript's:
+attribute access and indexing build up a path, calling it sends an "event" which is resolved against the tree
+Every event is recorded in FakeBackend.events and costs FakeBackend.latency (or latencies[command]) seconds
+
+Use:
+   * from AppleScriptWrapper.Basic import use_backend, get_app
+     from AppleScriptWrapper.fakebackend import FakeBackend
+     fake = use_backend(FakeBackend(latency=0.002))
+     keynote = get_app('Keynote')   # talks to fake.apps['Keynote']
+     keynote.get_title_of_slide(2)
+     fake.events                    # what that cost
+"""
+
+import time
+import collections
+
+GENERIC_TERMS = ['get', 'set', 'count', 'exists', 'properties', 'make', 'move', 'delete', 'duplicate',
+                 'activate', 'quit', 'launch', 'open', 'close', 'save', 'select', 'print_',
+                 'before', 'after', 'beginning', 'end', 'name', 'id', 'frontmost', 'version', 'class_',
+                 'documents', 'windows', 'path', 'modified', 'selection', 'isrunning']
+
+FakeEvent = collections.namedtuple('FakeEvent', 'app reference command args kwargs duration error')
+
+class FakeCommandError(Exception):
+    """ Looks like appscript's CommandError as far as the wrappers are concerned """
+    def __init__(self, number, message):
+        Exception.__init__(self, None, None, "Command failed: {0} ({1})".format(message, number))
+        self.errornumber = number
+
+    def __str__(self):
+        return str(self.args[2])
+
+def cant_get():
+    return FakeCommandError(-1728, "Can't get reference.")
+
+class Keyword(object):
+    """ Stand-in for appscript's k.something """
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Keyword) and other.name == self.name
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(('k', self.name))
+
+    def __repr__(self):
+        return 'k.{0}'.format(self.name)
+
+class _K(object):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Keyword(name)
+
+k = _K()
+
+class FakeTest(object):
+    """ Result of its.something == value, used to filter elements """
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def matches(self, obj):
+        return obj.get_property(self.name) == self.value
+
+    def __repr__(self):
+        return 'its.{0} == {1!r}'.format(self.name, self.value)
+
+class _ItsProperty(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, value):
+        return FakeTest(self.name, value)
+
+    __hash__ = object.__hash__
+
+class _Its(object):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _ItsProperty(name)
+
+its = _Its()
+
+class FakeAlias(object):
+    """ Stand-in for mactypes.Alias """
+    def __init__(self, path):
+        self.path = path
+
+    def __eq__(self, other):
+        return isinstance(other, FakeAlias) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return 'mactypes.Alias({0!r})'.format(self.path)
+
+class FakeObject(object):
+    """
+    One object in an application's tree
+    Property values may be callables, which are evaluated on every get
+    """
+    def __init__(self, class_name, properties=None, elements=None, commands=None):
+        self.class_name = class_name
+        self.properties = dict(properties or {})
+        self.elements = collections.OrderedDict()
+        self.commands = dict(commands or {})
+        self.parent = None
+        self.container = None
+        for plural, items in (elements or {}).items():
+            self.set_elements(plural, items)
+
+    def set_elements(self, plural, items):
+        self.elements[plural] = []
+        for item in items:
+            self.add_element(plural, item)
+
+    def add_element(self, plural, item, position=None):
+        items = self.elements.setdefault(plural, [])
+        if item.parent is not None:
+            item.parent.elements[item.container].remove(item)
+        item.parent, item.container = self, plural
+        if position is None:
+            items.append(item)
+        else:
+            items.insert(position, item)
+        return item
+
+    def get_property(self, name):
+        if name == 'properties':
+            return dict((Keyword(key), self.get_property(key)) for key in self.properties)
+        if name == 'class_':
+            return Keyword(self.class_name)
+        value = self.properties[name]
+        if callable(value):
+            value = value()
+        return value
+
+    def index(self):
+        """ AppleScript (1-based) index in the parent's element list """
+        return self.parent.elements[self.container].index(self) + 1
+
+    def path(self):
+        if self.parent is None:
+            return ()
+        return self.parent.path() + (('attr', self.container), ('index', self.index()))
+
+    def walk(self):
+        yield self
+        for items in self.elements.values():
+            for item in items:
+                for each in item.walk():
+                    yield each
+
+    def __repr__(self):
+        return '<FakeObject {0} {1}>'.format(self.class_name, self.properties.get('name', ''))
+
+class Plural(list):
+    """ Element collection that hasn't been narrowed down to one element yet (every, range, or filter) """
+
+class Mapped(list):
+    """ Results of applying a reference step to every member of a Plural """
+
+class Insertion(object):
+    def __init__(self, container, plural, position):
+        self.container = container
+        self.plural = plural
+        self.position = position
+
+class FakeReference(object):
+    """ Path into a FakeApplication, built up like an appscript reference """
+
+    def __init__(self, application, path=()):
+        self._application = application
+        self._path = path
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name not in self._application.terms:
+            raise AttributeError("Unknown property, element or command: '{0}'".format(name))
+        return FakeReference(self._application, self._path + (('attr', name),))
+
+    def __getitem__(self, key):
+        return FakeReference(self._application, self._path + (('index', key),))
+
+    def __iter__(self):
+        raise TypeError("references aren't iterable, get() them first")
+
+    def ID(self, value):
+        return FakeReference(self._application, self._path + (('id', value),))
+
+    def __call__(self, *args, **kwargs):
+        path = self._path
+        if path and path[-1][0] == 'attr' and path[-1][1] in self._application.command_names():
+            return self._application.send(path[-1][1], path[:-1], args, kwargs)
+        return self._application.send('get', path, args, kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeReference) and other._application is self._application and other._path == self._path
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._application), repr(self._path)))
+
+    def __repr__(self):
+        return self._application.render(self._path)
+
+class FakeApplication(object):
+    """
+    An application: a root FakeObject plus its terminology
+    Commands are looked up on the objects being targeted, then on the root, then the generic ones below
+    """
+    def __init__(self, backend, name, root, terms=()):
+        self.backend = backend
+        self.name = name
+        self.root = root
+        self.terms = set(GENERIC_TERMS) | set(terms)
+        for obj in root.walk():
+            self.terms.update(obj.properties)
+            self.terms.update(obj.elements)
+            self.terms.update(obj.commands)
+        self.reference = FakeReference(self)
+
+    def command_names(self):
+        names = set(['get', 'set', 'count', 'exists', 'make', 'move', 'delete', 'duplicate', 'activate',
+                     'quit', 'launch', 'open', 'close', 'save', 'select', 'isrunning'])
+        for obj in self.root.walk():
+            names.update(obj.commands)
+        return names
+
+    def render(self, path):
+        s = "app({0!r})".format(self.name)
+        for kind, value in path:
+            if kind == 'attr':
+                s += '.' + value
+            elif kind == 'id':
+                s += '.ID({0!r})'.format(value)
+            elif isinstance(value, slice):
+                s += '[{0}:{1}]'.format('' if value.start is None else value.start, '' if value.stop is None else value.stop)
+            else:
+                s += '[{0!r}]'.format(value)
+        return s
+
+    # Resolution
+
+    def resolve(self, path):
+        node = self.root
+        for segment in path:
+            node = self.step(node, segment)
+        return node
+
+    def step(self, node, segment):
+        kind, value = segment
+        if isinstance(node, Plural):
+            if kind == 'attr':
+                return Mapped(self.step(item, segment) for item in node)
+            return self.select(node, kind, value)
+        if isinstance(node, Mapped):
+            return Mapped(self.step(item, segment) for item in node)
+        if isinstance(node, FakeObject):
+            if kind != 'attr':
+                raise cant_get()
+            if value in node.elements:
+                return Plural(node.elements[value])
+            if value in ('before', 'after') and node.parent is not None:
+                position = node.index() - (1 if value == 'before' else 0)
+                return Insertion(node.parent, node.container, position)
+            if value == 'properties' or value == 'class_' or value in node.properties:
+                return node.get_property(value)
+            raise cant_get()
+        raise cant_get()
+
+    def select(self, items, kind, value):
+        if kind == 'id':
+            for item in items:
+                if item.properties.get('id') == value:
+                    return item
+            raise cant_get()
+        if isinstance(value, FakeTest):
+            return Plural(item for item in items if value.matches(item))
+        if isinstance(value, slice):
+            start = 1 if value.start is None else value.start
+            stop = len(items) if value.stop is None else value.stop
+            if start < 0:
+                start = len(items) + start + 1
+            if stop < 0:
+                stop = len(items) + stop + 1
+            return Plural(items[start - 1:stop])
+        if isinstance(value, FakeAlias):
+            for item in items:
+                if item.properties.get('path') == value.path:
+                    return item
+            raise cant_get()
+        if isinstance(value, str):
+            for item in items:
+                if item.properties.get('name') == value:
+                    return item
+            raise cant_get()
+        if isinstance(value, int):
+            if value == 0:
+                value = 1   # the wrappers often say documents[0] for the front document
+            try:
+                return items[value - 1 if value > 0 else value]
+            except IndexError:
+                raise cant_get()
+        raise cant_get()
+
+    def to_result(self, node):
+        if isinstance(node, FakeObject):
+            return FakeReference(self, node.path())
+        if isinstance(node, (Plural, Mapped)):
+            return [self.to_result(item) for item in node]
+        if isinstance(node, dict):
+            return dict((key, self.to_result(value)) for key, value in node.items())
+        return node
+
+    def objects(self, node):
+        """ Flattens a resolved node into the FakeObjects it refers to """
+        if isinstance(node, FakeObject):
+            return [node]
+        if isinstance(node, (Plural, Mapped)):
+            return [obj for item in node for obj in self.objects(item)]
+        return []
+
+    def deref(self, value):
+        """ Turns reference arguments into whatever they point to """
+        if isinstance(value, FakeReference) and value._application is self:
+            return self.resolve(value._path)
+        if isinstance(value, list):
+            return [self.deref(v) for v in value]
+        return value
+
+    # Sending events
+
+    def send(self, command, path, args, kwargs):
+        return self.backend.send(self, command, path, args, kwargs)
+
+    def execute(self, command, path, args, kwargs):
+        subject = path
+        if not path and args and isinstance(args[0], FakeReference) and command not in ('get', 'set', 'count'):
+            subject, args = args[0]._path, args[1:]   # direct parameter, eg app.close(document)
+        elif not path and args and isinstance(args[0], list) and args[0] \
+                and all(isinstance(a, FakeReference) for a in args[0]) and command not in ('get', 'set', 'count'):
+            return [self.execute(command, (), (a,) + tuple(args[1:]), kwargs) for a in args[0]]
+        for obj in self.candidates(subject):
+            handler = obj.commands.get(command)
+            if handler:
+                return self.to_result(handler(self, subject, *args, **kwargs))
+        handler = getattr(self, 'do_' + command, None)
+        if handler is None:
+            raise FakeCommandError(-1708, "Event not handled.")
+        return self.to_result(handler(subject, *args, **kwargs))
+
+    def candidates(self, path):
+        """ Objects that might define a custom command: the target itself, then the application """
+        found = []
+        try:
+            found = self.objects(self.resolve(path))[:1]
+        except FakeCommandError:
+            pass
+        return found + [self.root]
+
+    # Generic commands
+
+    def do_get(self, path, **kwargs):
+        return self.resolve(path)
+
+    def do_set(self, path, value=None, to=None):
+        if to is not None:
+            value = to
+        if not path or path[-1][0] != 'attr':
+            raise FakeCommandError(-10006, "Can't set reference.")
+        name = path[-1][1]
+        targets = self.objects(self.resolve(path[:-1]))
+        if not targets:
+            raise cant_get()
+        for obj in targets:
+            if name not in obj.properties:
+                raise cant_get()
+            obj.properties[name] = self.deref(value)
+
+    def do_count(self, path, each=None):
+        node = self.resolve(path)
+        if isinstance(node, FakeObject) and each is not None:
+            for plural, items in node.elements.items():
+                if plural.rstrip('s') == each.name or (items and items[0].class_name == each.name):
+                    return len(items)
+            return 0
+        if isinstance(node, (Plural, Mapped)):
+            return len(node)
+        if isinstance(node, str):
+            return len(node)
+        raise cant_get()
+
+    def do_exists(self, path):
+        try:
+            self.resolve(path)
+            return True
+        except FakeCommandError:
+            return False
+
+    def do_make(self, path, new=None, at=None, with_data=None, with_properties=None):
+        if new is None:
+            raise FakeCommandError(-1715, "Some parameter was missing for make.")   # as when routing probes it
+        location = Insertion(self.root, 'documents', None)
+        if isinstance(at, FakeReference) and at._path and at._path[-1][1] in ('end', 'beginning'):
+            where, base_path = at._path[-1][1], at._path[:-1]
+            base = self.resolve(base_path)
+            owner = self.objects(self.resolve(base_path[:-1]))[0] if len(base_path) > 1 else self.root
+            name = base_path[-1][1]
+            if isinstance(base, str):
+                data = with_data or ''
+                owner.properties[name] = base + data if where == 'end' else data + base
+                return None
+            location = Insertion(owner, name, None if where == 'end' else 0)
+        elif at is not None:
+            location = self.deref(at)
+        if not isinstance(location, Insertion):
+            raise FakeCommandError(-10000, "Bad insertion location.")
+        properties = dict((key.name if isinstance(key, Keyword) else key, value)
+                          for key, value in (with_properties or {}).items())
+        if with_data is not None:
+            properties.setdefault('data', with_data)
+        if location.plural == 'documents':   # as make_document would have it: unsaved, so no path yet
+            properties.setdefault('path', None)
+            properties.setdefault('modified', False)
+        obj = FakeObject(new.name if new is not None else 'item', properties)
+        return location.container.add_element(location.plural, obj, location.position)
+
+    def do_move(self, path, to=None):
+        if isinstance(to, FakeReference) and to._path and to._path[-1][0] == 'attr':
+            parent = self.resolve(to._path[:-1]) if to._path[:-1] else self.root
+            if isinstance(parent, FakeObject) and to._path[-1][1] in parent.elements:
+                to = Insertion(parent, to._path[-1][1], None)   # to a container, eg move(x, to=app.trash)
+        location = self.deref(to)
+        if not isinstance(location, Insertion):
+            raise FakeCommandError(-10000, "Bad insertion location.")
+        moved = self.objects(self.resolve(path))
+        position = location.position
+        for obj in moved:
+            if position is not None and obj.parent is location.container and obj.container == location.plural \
+               and obj.index() <= position:
+                position -= 1
+            location.container.add_element(location.plural, obj, position)
+            if position is not None:
+                position += 1
+        return moved[0] if len(moved) == 1 else Mapped(moved)
+
+    def do_delete(self, path):
+        for obj in self.objects(self.resolve(path)):
+            obj.parent.elements[obj.container].remove(obj)
+            obj.parent = None
+
+    def do_close(self, path, saving=None):
+        if not path:
+            raise FakeCommandError(-1708, "Event not handled.")
+        self.do_delete(path)
+
+    def do_save(self, path, in_=None, as_=None):
+        for obj in self.objects(self.resolve(path)):
+            if in_ is not None:
+                obj.properties['path'] = in_
+            obj.properties['modified'] = False
+
+    def do_activate(self, path):
+        self.backend.bring_to_front(self.name)
+
+    def do_launch(self, path):
+        pass
+
+    def do_quit(self, path):
+        self.backend.running.discard(self.name)
+
+    def do_isrunning(self, path):
+        return self.name in self.backend.running
+
+    def do_open(self, path, *args, **kwargs):
+        pass
+
+    def do_select(self, path, *args, **kwargs):
+        self.root.properties['selection'] = args[0] if args else path
+
+class FakeBackend(object):
+    """
+    A world of fake applications, all sharing one event log and a notion of which app is frontmost
+    latency is slept for every event, latencies can override it per command name
+    """
+    name = 'fake'
+    CommandError = FakeCommandError
+    Alias = FakeAlias
+    k = k
+    its = its
+
+    def __init__(self, latency=0.0, latencies=None, menus=None):
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.menus = dict(menus or {})   # app name -> menu spec, see make_menu_bar
+        self.events = []
+        self.apps = {}
+        self.osaxen = {}
+        self.running = set()
+        self.front = None
+        self.clipboard = ''
+        self.dialog_responses = collections.deque()
+        self.list_responses = collections.deque()
+        self.shell_results = {}
+        self._processes = {}
+
+    # Interface shared with AppscriptBackend
+
+    def app(self, name):
+        return self.application(name).reference
+
+    def osax(self, name=None):
+        key = name or 'current application'
+        if key not in self.osaxen:
+            self.osaxen[key] = make_standard_additions(self, key)
+        return self.osaxen[key].reference
+
+    def alias(self, path):
+        return FakeAlias(path)
+
+    def is_missing_reference(self, error):
+        return getattr(error, 'errornumber', None) == -1728
+
+    def is_reference(self, value):
+        if not isinstance(value, FakeReference):
+            return False
+        path = value._path
+        return not (path and path[-1][0] == 'attr' and path[-1][1] in value._application.command_names())
+
+    # Fake world
+
+    def application(self, name):
+        if name not in self.apps:
+            factory = APPLICATIONS.get(name, make_document_app)
+            self.apps[name] = factory(self, name)
+        self.running.add(name)
+        return self.apps[name]
+
+    def bring_to_front(self, name):
+        self.running.add(name)
+        self.front = name
+
+    def process(self, name):
+        """ System Events' process for an app, created on demand and kept so its menus have state """
+        if name not in self._processes:
+            app = name
+            proc = FakeObject('process', {'name': name, 'short_name': name,
+                                         'frontmost': lambda: self.front == app,
+                                         'visible': True},
+                              {'menu_bars': [make_menu_bar(self.menus.get(name, DEFAULT_MENUS.get(name, {})))]},
+                              commands={'keystroke': self._typed('keystroke', name),
+                                        'key_code': self._typed('key_code', name),
+                                        'click': _click})
+            proc.typed = []
+            self._processes[name] = proc
+        return self._processes[name]
+
+    def _typed(self, command, name):
+        def handler(application, path, what=None, using=None):
+            self.process(name).typed.append((command, what, tuple(u.name for u in using or [])))
+        return handler
+
+    def send(self, application, command, path, args, kwargs):
+        """ Every event goes through here """
+        error = None
+        start = time.time()
+        delay = self.latencies.get(command, self.latency)
+        if delay:
+            time.sleep(delay)
+        try:
+            return application.execute(command, path, args, kwargs)
+        except FakeCommandError as e:
+            error = e.errornumber
+            raise
+        finally:
+            self.events.append(FakeEvent(application.name, application.render(path), command,
+                                         args, kwargs, time.time() - start, error))
+
+    def reset_events(self):
+        self.events = []
+
+    def event_count(self, app=None, command=None):
+        return len([e for e in self.events if (app is None or e.app == app) and (command is None or e.command == command)])
+
+    def typed(self, app_name):
+        """ Keystrokes and key codes sent to app_name via System Events """
+        return self.process(app_name).typed
+
+# Builders for the fake applications
+
+def _click(application, path, *args, **kwargs):
+    for obj in application.objects(application.resolve(path)):
+        obj.properties.setdefault('clicks', 0)
+        obj.properties['clicks'] += 1
+        if 'selected' in obj.properties and obj.properties.get('toggles'):
+            obj.properties['selected'] = not obj.properties['selected']
+
+def make_menu_item(spec):
+    """ spec is a name, or a dict with name, enabled, selected, toggles and submenu (list of specs) """
+    if isinstance(spec, str):
+        spec = {'name': spec}
+    properties = {'name': spec['name'], 'enabled': spec.get('enabled', True), 'selected': spec.get('selected', False),
+                  'toggles': spec.get('toggles', False)}
+    menus = []
+    if 'submenu' in spec:
+        menus = [FakeObject('menu', {'name': spec['name']}, {'menu_items': [make_menu_item(s) for s in spec['submenu']]})]
+    return FakeObject('menu_item', properties, {'menus': menus}, commands={'click': _click})
+
+def make_menu_bar(spec):
+    bar_items = []
+    for menu, items in spec.items():
+        menu_obj = FakeObject('menu', {'name': menu}, {'menu_items': [make_menu_item(s) for s in items]})
+        bar_items.append(FakeObject('menu_bar_item', {'name': menu, 'enabled': True}, {'menus': [menu_obj]},
+                                    commands={'click': _click}))
+    return FakeObject('menu_bar', {'name': 'menu bar'}, {'menu_bar_items': bar_items})
+
+DEFAULT_MENUS = {
+    'Keynote': {'File': ['New', 'Open…', 'Save', 'Save As…'],
+                'Edit': ['Undo', 'Copy', 'Paste'],
+                'Insert': ['Comment', {'name': 'Chart', 'submenu': ['Bar', 'Line']}],
+                'View': [{'name': 'Show Presenter Notes', 'toggles': True}, {'name': 'Navigator', 'toggles': True}]},
+    'Photo Booth': {'File': ['Take Photo', 'Export…']},
+    'Preview': {'Window': ['Zoom', 'Minimize']},
+    'TextEdit': {'File': ['New', 'Save', 'Save as PDF…']},
+}
+
+def make_document(name, path=None, **properties):
+    properties.update({'name': name, 'path': path, 'modified': properties.get('modified', False)})
+    return FakeObject('document', properties)
+
+def make_document_app(backend, name, documents=None, properties=None, terms=()):
+    root = FakeObject('application', dict({'name': name, 'frontmost': lambda: backend.front == name,
+                                           'version': '1.0'}, **(properties or {})),
+                      {'documents': documents if documents is not None else [make_document('Untitled')],
+                       'windows': [FakeObject('window', {'name': 'Untitled'})]})
+    return FakeApplication(backend, name, root, terms)
+
+def make_system_events(backend, name):
+    root = FakeObject('application', {'name': name, 'UI_elements_enabled': True})
+    application = FakeApplication(backend, name, root,
+                                  ['processes', 'short_name', 'menu_bars', 'menu_bar_items', 'menus', 'menu_items',
+                                   'enabled', 'selected', 'click', 'keystroke', 'key_code', 'attributes', 'value'])
+    root.elements['processes'] = _LiveProcesses(backend)
+    return application
+
+class _LiveProcesses(list):
+    """ System Events' processes: one for every running fake application """
+    def __init__(self, backend):
+        list.__init__(self)
+        self.backend = backend
+
+    def _current(self):
+        procs = [self.backend.process(name) for name in sorted(self.backend.running) if name != 'System Events']
+        root = self.backend.apps['System Events'].root
+        for proc in procs:
+            proc.parent, proc.container = root, 'processes'
+        return procs
+
+    def __iter__(self):
+        return iter(self._current())
+
+    def __len__(self):
+        return len(self._current())
+
+    def __getitem__(self, i):
+        return self._current()[i]
+
+    def index(self, item):
+        return self._current().index(item)
+
+def make_slide(title='', body='', notes=''):
+    return FakeObject('slide', {'title': title, 'body': body, 'notes': notes})
+
+def make_keynote(backend, name, slides=None):
+    slides = slides if slides is not None else [make_slide('Slide {0}'.format(i), 'Body {0}'.format(i)) for i in range(1, 6)]
+    slideshow = FakeObject('slideshow', {'name': 'Lecture.key', 'path': '/tmp/Lecture.key', 'modified': False},
+                           {'slides': slides})
+    slideshow.properties['current_slide'] = slideshow.elements['slides'][0]
+    for slide in slideshow.elements['slides']:
+        _number_slide(slide)
+    state = {'playing': False}
+
+    def current(application):
+        return application.root.elements['slideshows'][0]
+
+    def start(application, path, *args, **kwargs):
+        state['playing'] = True
+        backend.bring_to_front(name)
+
+    def start_from(application, path, slide=None, **kwargs):
+        start(application, path)
+        jump_to(application, path, slide)
+
+    def stop_slideshow(application, path, *args, **kwargs):
+        state['playing'] = False
+
+    def advance(application, path, *args, **kwargs):
+        show = current(application)
+        slides = show.elements['slides']
+        i = slides.index(show.properties['current_slide'])
+        if i + 1 < len(slides):
+            show.properties['current_slide'] = slides[i + 1]
+
+    def jump_to(application, path, slide=None, **kwargs):
+        if slide is None:   # given as the direct parameter, so it's the subject
+            targets = application.objects(application.resolve(path)) if path else []
+        else:
+            targets = application.objects(application.deref(slide))
+        if not targets:
+            raise cant_get()
+        target = targets[0]
+        target.parent.properties['current_slide'] = target
+
+    root = FakeObject('application', {'name': name, 'frontmost': lambda: backend.front == name, 'version': '5.0',
+                                      'playing': lambda: state['playing'], 'frozen': False},
+                      {'slideshows': [slideshow], 'windows': [FakeObject('window', {'name': 'Lecture.key'})]},
+                      commands={'start': start, 'start_from': start_from, 'stop_slideshow': stop_slideshow,
+                                'advance': advance, 'jump_to': jump_to})
+    return FakeApplication(backend, name, root, ['slide', 'slide_number', 'add_chart'])
+
+def _number_slide(slide):
+    slide.properties['slide_number'] = lambda: slide.index() if slide.parent else None
+
+def make_finder(backend, name, paths=('/tmp', '/tmp/a.txt', '/tmp/b.txt')):
+    items = [FakeObject('item', {'name': p.rsplit('/', 1)[-1] or '/', 'path': p, 'comment': '', 'label_index': 0})
+             for p in paths]
+
+    def reveal(application, path, *args, **kwargs):
+        application.root.properties['revealed'] = args[0] if args else None
+
+    root = FakeObject('application', {'name': name, 'frontmost': lambda: backend.front == name, 'version': '10.7',
+                                      'selection': [], 'revealed': None},
+                      {'items': items, 'windows': [FakeObject('window', {'name': 'Desktop'})]},
+                      commands={'reveal': reveal})
+    root.elements['trash'] = []
+    return FakeApplication(backend, name, root, ['startup_disk', 'folders', 'document_files', 'label', 'alias', 'trash'])
+
+def make_pages(backend, name):
+    doc = make_document('Untitled.pages', None, body_text='')
+    return make_document_app(backend, name, [doc], terms=['body_text', 'characters', 'text', 'word', 'character'])
+
+def make_textedit(backend, name):
+    doc = make_document('Untitled.txt', None, text='')
+    return make_document_app(backend, name, [doc], terms=['text', 'word'])
+
+def make_quicktime(backend, name):
+    state = {'current_time': 42.0}
+    doc = make_document('Movie.mov', '/tmp/Movie.mov', duration=120.0, playing=False)
+    doc.properties['current_time'] = lambda: state['current_time']
+
+    def step_backward(application, path, by=1, **kwargs):
+        state['current_time'] = max(0.0, state['current_time'] - by / 600.0)
+
+    def play(application, path, *args, **kwargs):
+        doc.properties['playing'] = True
+
+    def stop(application, path, *args, **kwargs):
+        doc.properties['playing'] = False
+
+    def present(application, path, *args, **kwargs):
+        doc.properties['presenting'] = True
+
+    commands = {'step_backward': step_backward, 'play': play, 'stop': stop, 'present': present}
+    app = make_document_app(backend, name, [doc])
+    app.root.commands.update(commands)   # with no direct parameter they act on the front movie
+    app.terms.update(commands)
+    return app
+
+def make_provoc(backend, name):
+    def export(application, path, *args, **kwargs):
+        return "house\tdas Haus\thouse.png\ncat\tdie Katze\tcat.png\n"
+    app = make_document_app(backend, name, [make_document('German.provoc', '/tmp/German.provoc')])
+    app.root.commands['export'] = export
+    app.terms.add('export')
+    return app
+
+def make_standard_additions(backend, key):
+    def display_dialog(application, path, prompt='', default_answer=None, buttons=('OK',), **kwargs):
+        if backend.dialog_responses:
+            return backend.dialog_responses.popleft()
+        response = {k.button_returned: buttons[-1]}
+        if default_answer is not None:
+            response[k.text_returned] = default_answer
+        return response
+
+    def display_alert(application, path, *args, **kwargs):
+        return {k.button_returned: 'OK'}
+
+    def choose_from_list(application, path, llist=(), **kwargs):
+        if backend.list_responses:
+            return backend.list_responses.popleft()
+        return list(llist)[:1]
+
+    def choose_file(application, path, **kwargs):
+        return FakeAlias('/tmp/chosen')
+
+    def do_shell_script(application, path, command='', **kwargs):
+        return backend.shell_results.get(command, '')
+
+    def the_clipboard(application, path, **kwargs):
+        return backend.clipboard
+
+    def set_the_clipboard_to(application, path, value=None, **kwargs):
+        backend.clipboard = value
+
+    def current_date(application, path, **kwargs):
+        return time.time()
+
+    def nothing(application, path, *args, **kwargs):
+        return None
+
+    commands = {'display_dialog': display_dialog, 'display_alert': display_alert, 'choose_from_list': choose_from_list,
+                'choose_file': choose_file, 'do_shell_script': do_shell_script, 'the_clipboard': the_clipboard,
+                'set_the_clipboard_to': set_the_clipboard_to, 'current_date': current_date,
+                'beep': nothing, 'say': nothing}
+    root = FakeObject('application', {'name': 'StandardAdditions'}, commands=commands)
+    return FakeApplication(backend, 'StandardAdditions({0})'.format(key), root)
+
+APPLICATIONS = {
+    'System Events': make_system_events,
+    'Keynote': make_keynote,
+    'Finder': make_finder,
+    'Pages': make_pages,
+    'TextEdit': make_textedit,
+    'QuickTime Player': make_quicktime,
+    'ProVoc': make_provoc,
+}
@@ -0,0 +1,62 @@
+"""
+Converting what the wrappers take and return to and from JSON, for the server and the runbook runner
+
+Going out, keywords (k.something) become {"$k": "something"}, dates ISO strings, and anything else that
+JSON can't hold, such as references, {"$repr": "app('Keynote').slideshows[1]"}
+Coming in, {"$k": "name"} becomes the backend's k.name and {"$alias": "/path"} a file alias
+"""
+
+import datetime
+
+def jsonable(value):
+    """ value made of things JSON can hold """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return dict((_key(k), jsonable(v)) for k, v in value.items())
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    name = _keyword_name(value)
+    if name is not None:
+        return {'$k': name}
+    return {'$repr': repr(value)}
+
+def _keyword_name(value):
+    """ appscript's keywords (and the fake's) have a name and print as k.name """
+    name = getattr(value, 'name', None)
+    if isinstance(name, str) and repr(value) == 'k.' + name:
+        return name
+    return None
+
+def _key(key):
+    if isinstance(key, str):
+        return key
+    name = _keyword_name(key)
+    return name if name is not None else repr(key)
+
+def from_jsonable(value, backend=None):
+    """ Arguments as decoded from JSON, with {"$k": ...} and {"$alias": ...} turned back into the real things """
+    if isinstance(value, list):
+        return [from_jsonable(v, backend) for v in value]
+    if isinstance(value, dict):
+        if len(value) == 1 and ('$k' in value or '$alias' in value):
+            if backend is None:
+                from AppleScriptWrapper.backend import get_backend
+                backend = get_backend()
+            if '$k' in value:
+                return getattr(backend.k, value['$k'])
+            return backend.alias(value['$alias'])
+        return dict((k, from_jsonable(v, backend)) for k, v in value.items())
+    return value
+
+def error_dict(e):
+    """ An exception as JSON """
+    error = {'type': type(e).__name__, 'message': str(e)}
+    number = getattr(e, 'errornumber', None)
+    if number is not None:
+        error['number'] = number
+    return error
@@ -0,0 +1,118 @@
+"""
+Keystroke macros: a little language for GUI typing, compiled into as few System Events calls as possible
+
+    "{command+G}{wait}/Users/me/Desktop{return}"
+
+Plain text is typed as is, braces hold everything else:
+   * {return} {tab} {space}                         named characters, typed along with the text around them
+   * {escape} {down arrow} {up arrow} ...            keys that need a key code, see KEY_CODES
+   * {command+s} {command+shift+down arrow}          modifiers (command, option, control, shift) with a key
+   * {down arrow*3} {x*10} {command+z*2}             repeats
+   * {wait} {wait 0.5}                               a pause: the wrapper's adaptive one, or so many seconds
+   * {{ and }}                                       literal braces, see escape()
+
+Consecutive text with the same modifiers becomes one keystroke call, consecutive key codes one key_code call with a list
+
+Use:
+   * wrapper.type_macro("{command+a}{delete}Hello{return}")
+"""
+
+KEY_CODES = {'escape': 53, 'down arrow': 125, 'up arrow': 126, 'left arrow': 123, 'right arrow': 124,
+             'delete': 51, 'forward delete': 117, 'home': 115, 'end': 119, 'page up': 116, 'page down': 121,
+             'enter': 76}
+NAMED_TEXT = {'return': '\r', 'tab': '\t', 'space': ' '}
+MODIFIERS = {'command': 'command_down', 'cmd': 'command_down', 'option': 'option_down', 'alt': 'option_down',
+             'control': 'control_down', 'ctrl': 'control_down', 'shift': 'shift_down'}
+
+class MacroError(Exception): pass
+
+def escape(text):
+    """ Makes text safe to put in a macro """
+    return text.replace('{', '{{').replace('}', '}}')
+
+def _tokens(source):
+    """ Yields ('text', s) and ('braced', s) """
+    text = []
+    i = 0
+    while i < len(source):
+        c = source[i]
+        if c in '{}' and source[i:i+2] in ('{{', '}}'):
+            text.append(c)
+            i += 2
+        elif c == '{':
+            end = source.find('}', i)
+            if end == -1:
+                raise MacroError("Unclosed brace at {0} in {1!r}".format(i, source))
+            if text:
+                yield 'text', ''.join(text)
+                text = []
+            yield 'braced', source[i+1:end]
+            i = end + 1
+        elif c == '}':
+            raise MacroError("Stray closing brace at {0} in {1!r}".format(i, source))
+        else:
+            text.append(c)
+            i += 1
+    if text:
+        yield 'text', ''.join(text)
+
+def _parse_braced(token):
+    """ Returns an op: ('keystroke', text, modifiers), ('key_code', [codes], modifiers) or ('wait', seconds) """
+    words = token.split()
+    if words and words[0].lower() == 'wait':
+        if len(words) == 1:
+            return ('wait', None, ())
+        try:
+            return ('wait', float(words[1]), ())
+        except ValueError:
+            raise MacroError("Bad wait {{{0}}}".format(token))
+    times = 1
+    key, star, count = token.rpartition('*')
+    if star and key and count.strip().isdigit():   # {tab*3}; {shift+*} is just a *
+        token, times = key, int(count)
+    parts = token.split('+')
+    key = parts.pop()
+    if not key and parts:   # {command++}
+        key = '+'
+        parts.pop()
+    modifiers = []
+    for part in parts:
+        modifier = MODIFIERS.get(part.strip().lower())
+        if not modifier:
+            raise MacroError("Unknown modifier {0!r}".format(part))
+        if modifier not in modifiers:
+            modifiers.append(modifier)
+    modifiers = tuple(sorted(modifiers))
+    name = key.strip().lower()
+    if name in KEY_CODES:
+        return ('key_code', [KEY_CODES[name]] * times, modifiers)
+    if name in NAMED_TEXT:
+        return ('keystroke', NAMED_TEXT[name] * times, modifiers)
+    if len(key) == 1:
+        return ('keystroke', key * times, modifiers)
+    raise MacroError("Unknown key {0!r}".format(key))
+
+def compile_macro(source):
+    """ List of ops for source, with neighbouring ops merged wherever one call can do the work of several """
+    ops = []
+    for kind, value in _tokens(source):
+        op = ('keystroke', value, ()) if kind == 'text' else _parse_braced(value)
+        if ops and op[0] != 'wait' and ops[-1][0] == op[0] and ops[-1][2] == op[2]:
+            previous = ops.pop()
+            op = (op[0], previous[1] + op[1], op[2])
+        ops.append(op)
+    return ops
+
+class KeystrokeMacro(object):
+
+    def __init__(self, source):
+        self.source = source
+        self.ops = compile_macro(source)
+
+    @property
+    def calls(self):
+        """ How many System Events calls typing this takes """
+        return len([op for op in self.ops if op[0] != 'wait'])
+
+    def __repr__(self):
+        return "<KeystrokeMacro {0!r}: {1} calls>".format(self.source, self.calls)
@@ -0,0 +1,118 @@
+"""
+Short-lived memory of read-only properties, so that asking "playing?" ten times in a loop isn't ten events
+
+Each wrapper has a PropertyMemo (wrapper.memo, None to turn it off). Properties named in its ttls, fetched through
+the wrapper (self.playing(), self.path(), self.count(each=...)), are remembered for that many seconds, the least
+recently used ones dropped once there are more than maxsize. Anything that could change what the app would answer
+forgets it all: a command in MUTATING going through the wrapper, anything sent with wrapper.send, and the
+wrapper's own methods that change things, which call self._mutated(). Commands sent on self.application (or
+references from it) directly go unnoticed, so what's remembered then lasts until its ttl is up
+"""
+
+import time
+import threading
+import collections
+
+DEFAULT_TTLS = {'playing': 0.25, 'frontmost': 0.25, 'name': 2.0, 'path': 2.0, 'current_time': 0.1,
+                'duration': 2.0, 'count': 1.0, 'modified': 0.5, 'version': 60.0, 'frozen': 0.25}
+
+MUTATING = frozenset(['set', 'make', 'move', 'delete', 'duplicate', 'save', 'close', 'open', 'quit', 'launch',
+                      'advance', 'jump_to', 'start', 'start_from', 'stop_slideshow', 'show_next', 'show_previous',
+                      'play', 'stop', 'pause', 'step_backward', 'step_forward', 'present', 'export', 'reveal',
+                      'keystroke', 'key_code', 'click', 'select', 'do_JavaScript', 'do_shell_script'])
+
+class PropertyMemo(object):
+
+    def __init__(self, ttls=None, maxsize=256):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._values = collections.OrderedDict()   # key -> (expires, name, value), oldest use first
+        self._lock = threading.Lock()
+
+    def wants(self, name):
+        return bool(self.ttls.get(name))
+
+    def fetch(self, name, reference, args=(), kwargs=None):
+        """ reference(*args, **kwargs), from memory if it was asked within the last ttls[name] seconds """
+        key = (name, repr(reference), repr(args), repr(sorted((kwargs or {}).items())))
+        now = time.time()
+        with self._lock:
+            found = self._values.get(key)
+            if found is not None and found[0] > now:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return found[2]
+        value = reference(*args, **(kwargs or {}))
+        with self._lock:
+            self.misses += 1
+            self._values[key] = (time.time() + self.ttls[name], name, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, *names):
+        """ Forget the given properties, or everything """
+        with self._lock:
+            self.invalidations += 1
+            if not names:
+                self._values.clear()
+                return
+            for key in [key for key, found in self._values.items() if found[1] in names]:
+                del self._values[key]
+
+    def __len__(self):
+        return len(self._values)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'size': len(self._values)}
+
+class MemoizedProperty(object):
+    """ What the wrapper hands out for a memoized property: calling it goes through the memo """
+    __slots__ = ('_memo', '_name', '_reference')
+
+    def __init__(self, memo, name, reference):
+        self._memo = memo
+        self._name = name
+        self._reference = reference
+
+    def __call__(self, *args, **kwargs):
+        return self._memo.fetch(self._name, self._reference, args, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._reference, name)
+
+    def __getitem__(self, key):
+        return self._reference[key]
+
+    def __repr__(self):
+        return repr(self._reference)
+
+class MutatingCommand(object):
+    """ What the wrapper hands out for a command in MUTATING: calls mutated (the wrapper's _mutated) once it has been sent """
+    __slots__ = ('_mutated', '_reference')
+
+    def __init__(self, mutated, reference):
+        self._mutated = mutated
+        self._reference = reference
+
+    def __call__(self, *args, **kwargs):
+        try:
+            return self._reference(*args, **kwargs)
+        finally:
+            self._mutated()
+
+    def __getattr__(self, name):
+        return getattr(self._reference, name)
+
+    def __getitem__(self, key):
+        return self._reference[key]
+
+    def __repr__(self):
+        return repr(self._reference)
@@ -0,0 +1,110 @@
+"""
+Snapshot of an app's menu bar, taken with a handful of bulk System Events requests
+
+Asking System Events about one menu item at a time means building a reference five levels deep and
+a round trip per question; a MenuSnapshot fetches names, enabled and checked state of every item
+(and of every submenu item) at once and answers from an index keyed by (menu, submenu, item)
+
+AppleScriptWrapper keeps one, see menu_item_present and friends. Clicking doesn't need it: clicks go straight
+to a reference built from the names, after which only the menu clicked in is marked stale, to be re-read the
+next time it's asked about
+"""
+
+import time
+
+class MenuEntry(object):
+    __slots__ = ('menu', 'submenu', 'name', 'enabled', 'checked', 'reference')
+
+    def __init__(self, menu, submenu, name, enabled, checked, reference):
+        self.menu = menu
+        self.submenu = submenu
+        self.name = name
+        self.enabled = enabled
+        self.checked = checked
+        self.reference = reference
+
+    def __repr__(self):
+        return "<MenuEntry {0}>".format(" > ".join(n for n in (self.menu, self.submenu, self.name) if n))
+
+def _column(values, i, default=None):
+    try:
+        return values[i]
+    except (IndexError, TypeError):
+        return default
+
+class MenuSnapshot(object):
+    """
+    process is the System Events process reference, eg app('System Events').processes['Keynote']
+    ttl is how many seconds the snapshot is good for (None for as long as it isn't invalidated)
+    """
+    def __init__(self, process, ttl=2.0):
+        self.process = process
+        self.ttl = ttl
+        self.taken = None
+        self.requests = 0
+        self.stale = set()   # menus that may have changed since the snapshot was taken
+        self._index = {}
+
+    def expired(self):
+        if self.taken is None:
+            return True
+        return self.ttl is not None and time.time() - self.taken > self.ttl
+
+    def mark_stale(self, menu):
+        self.stale.add(menu)
+
+    def _fetch(self, reference):
+        self.requests += 1
+        return reference()
+
+    def refresh(self):
+        """ Re-reads the whole menu bar, returns self """
+        self._index = {}
+        self.stale = set()
+        self.taken = time.time()
+        bar = self.process.menu_bars[1].menu_bar_items
+        try:
+            menus = self._fetch(bar.name)
+            items = bar.menus[1].menu_items
+            names = self._fetch(items.name)
+            enabled = self._fetch(items.enabled)
+            checked = self._fetch(items.selected)
+        except Exception:
+            return self   # no menus to speak of, or GUI scripting is off
+        for m, menu in enumerate(menus):
+            for i, name in enumerate(_column(names, m, [])):
+                self._add(menu, None, name, _column(_column(enabled, m), i, True), _column(_column(checked, m), i, False))
+        try:
+            sub = items.menus.menu_items
+            sub_names = self._fetch(sub.name)
+            sub_enabled = self._fetch(sub.enabled)
+            sub_checked = self._fetch(sub.selected)
+        except Exception:
+            return self
+        for m, menu in enumerate(menus):
+            for i, submenu in enumerate(_column(names, m, [])):
+                # one list per submenu of the item, which is either none or one
+                for names_in, enabled_in, checked_in in zip(_column(_column(sub_names, m), i, []),
+                                                             _column(_column(sub_enabled, m), i, []),
+                                                             _column(_column(sub_checked, m), i, [])):
+                    for j, name in enumerate(names_in):
+                        self._add(menu, submenu, name, _column(enabled_in, j, True), _column(checked_in, j, False))
+        return self
+
+    def _add(self, menu, submenu, name, enabled, checked):
+        if name is None or (menu, submenu, name) in self._index:
+            return
+        ref = self.process.menu_bars[1].menu_bar_items[menu].menus[menu].menu_items
+        if submenu is not None:
+            ref = ref[submenu].menus[submenu].menu_items
+        self._index[(menu, submenu, name)] = MenuEntry(menu, submenu, name, enabled, checked, ref[name])
+
+    def lookup(self, menu, item, submenu=None):
+        """ MenuEntry for the item, or None if there isn't one """
+        return self._index.get((menu, submenu, item))
+
+    def items(self, menu, submenu=None):
+        return [entry for key, entry in self._index.items() if key[0] == menu and key[1] == submenu]
+
+    def __len__(self):
+        return len(self._index)
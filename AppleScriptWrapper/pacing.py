@@ -0,0 +1,121 @@
+"""
+Adaptive pauses for GUI scripting
+
+GUI scripting needs a short pause around each keystroke or menu click so the app can keep up,
+AppleScriptWrapper used to sleep a fixed 0.25 seconds each time. A Pacer learns, per app and per kind of action,
+the shortest pause that still works: it starts low, shortens a little after every success and backs off sharply
+after a failure (eg a menu item that wasn't there yet). What it has learned is saved to disk for next time.
+
+Use:
+   * wrapper.pacer = Pacer()        # each wrapper uses default_pacer unless told otherwise
+   * wrapper.pacer = None           # back to fixed waits of wrapper._wait
+   * default_pacer.time_saved       # seconds not spent sleeping, compared with the fixed waits
+"""
+
+import os
+import time
+import threading
+
+PACING_FILE = os.path.join(os.path.expanduser('~'), '.AppleScriptWrapper', 'pacing.json')
+
+class Pacer(object):
+
+    def __init__(self, path=PACING_FILE, start=0.05, minimum=0.01, maximum=1.0, baseline=0.25, backoff=2.0, decay=0.95):
+        self.path = path
+        self.start = start
+        self.minimum = minimum
+        self.maximum = maximum
+        self.baseline = baseline   # what a fixed wait would have cost
+        self.backoff = backoff
+        self.decay = decay
+        self.time_saved = 0.0
+        self.successes = 0
+        self.failures = 0
+        self._delays = {}   # "app/action" -> seconds
+        self._dirty = False
+        self._loaded = not path
+        self._save_registered = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        """ What was learned last time is read in when first needed, rather than on import """
+        if not self._loaded:
+            self._loaded = True
+            self.load()
+
+    def _key(self, app_name, action):
+        return "{0}/{1}".format(app_name, action)
+
+    def delay(self, app_name, action):
+        self._ensure_loaded()
+        return self._delays.get(self._key(app_name, action), self.start)
+
+    def pause(self, app_name, action):
+        """ Sleeps for the learned delay, returns it """
+        delay = self.delay(app_name, action)
+        time.sleep(delay)
+        self.time_saved += self.baseline - delay
+        return delay
+
+    def success(self, app_name, action):
+        self.successes += 1
+        self._adjust(app_name, action, self.decay)
+
+    def failure(self, app_name, action):
+        self.failures += 1
+        self._adjust(app_name, action, self.backoff)
+
+    def _adjust(self, app_name, action, factor):
+        self._ensure_loaded()
+        key = self._key(app_name, action)
+        with self._lock:
+            delay = self._delays.get(key, self.start) * factor
+            self._delays[key] = min(self.maximum, max(self.minimum, delay))
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        """ Saving at exit is only arranged once there's something to save """
+        if not self._dirty and self.path and not self._save_registered:
+            import atexit
+            atexit.register(self.save)
+            self._save_registered = True
+        self._dirty = True
+
+    def forget(self, app_name=None):
+        """ Back to the starting delay for app_name, or for everything """
+        self._ensure_loaded()
+        with self._lock:
+            for key in list(self._delays):
+                if app_name is None or key.startswith(app_name + '/'):
+                    del self._delays[key]
+            self._mark_dirty()
+
+    def load(self):
+        import json
+        try:
+            with open(self.path) as f:
+                self._delays.update(json.load(f))
+        except (IOError, OSError, ValueError):
+            pass
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        import json
+        with self._lock:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                with open(self.path, 'w') as f:
+                    json.dump(self._delays, f, indent=1, sort_keys=True)
+                self._dirty = False
+            except (IOError, OSError):
+                pass
+
+    def stats(self):
+        self._ensure_loaded()
+        return {'time_saved': self.time_saved, 'successes': self.successes, 'failures': self.failures,
+                'delays': dict(self._delays)}
+
+default_pacer = Pacer()
@@ -0,0 +1,147 @@
+"""
+Runs a runbook of commands in one process
+
+    python -m AppleScriptWrapper run [FILE] [--parallel] [--ordered] [--stop-on-error] [--fake]
+
+reads commands from FILE (or stdin), one JSON object per line, each what you would give tell_app_to_do:
+
+    {"id": "intro", "app": "Keynote", "method": "get_title_of_slide", "args": [2], "kwargs": {}}
+
+and writes a result for each to stdout as soon as it's done, also one JSON object per line:
+
+    {"id": "intro", "line": 1, "app": "Keynote", "method": "get_title_of_slide", "ok": true, "result": "Introduction",
+     "ms": 2.7, "wait_ms": 0.0}
+
+Wrappers are made once per app and reused for every command. With --parallel commands for different apps run
+at the same time (each app's commands still in order, see scheduler.py), and results come out in the order
+they finish unless --ordered is given. Blank lines and lines starting with # are skipped. A summary goes to stderr
+"""
+
+import sys
+import json
+import time
+import threading
+import functools
+import contextlib
+
+from AppleScriptWrapper.jsonable import jsonable, from_jsonable, error_dict
+
+class Runbook(object):
+
+    def __init__(self, out=sys.stdout, parallel=False, ordered=False, stop_on_error=False, max_pending=100):
+        self.out = out
+        self.parallel = parallel
+        self.ordered = ordered
+        self.stop_on_error = stop_on_error
+        self.max_pending = max_pending
+        self.succeeded = 0
+        self.failed = 0
+        self.stopped = False
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_pending)
+        self._held = {}   # sequence number -> result, waiting for earlier ones when ordered
+        self._next = 0
+
+    def parse(self, number, line):
+        """ Command dict for a line, or None for a line to skip """
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return None
+        command = json.loads(line)
+        if not isinstance(command, dict) or 'app' not in command or 'method' not in command:
+            raise ValueError("Expected an object with app and method")
+        return command
+
+    def execute(self, number, command, submitted):
+        """ Runs one command, returns its result dict """
+        from AppleScriptWrapper.Basic import get_app
+        started = time.time()
+        result = {'id': command.get('id'), 'line': number, 'app': command['app'], 'method': command['method']}
+        try:
+            args = from_jsonable(list(command.get('args', ())))
+            kwargs = from_jsonable(command.get('kwargs') or {})
+            value = getattr(get_app(command['app']), command['method'])(*args, **kwargs)
+            result['ok'] = True
+            result['result'] = jsonable(value)
+        except Exception as e:
+            result['ok'] = False
+            result['error'] = error_dict(e)
+        result['ms'] = (time.time() - started) * 1000
+        result['wait_ms'] = (started - submitted) * 1000
+        return result
+
+    def emit(self, sequence, result):
+        with self._lock:
+            if result.get('ok'):
+                self.succeeded += 1
+            else:
+                self.failed += 1
+                if self.stop_on_error:
+                    self.stopped = True
+            if not self.ordered:
+                self._write(result)
+                return
+            self._held[sequence] = result
+            while self._next in self._held:
+                self._write(self._held.pop(self._next))
+                self._next += 1
+
+    def _write(self, result):
+        self.out.write(json.dumps(result) + "\n")
+        self.out.flush()
+
+    def run(self, lines):
+        """ Runs every command in lines (an iterable of strings), returns True if they all succeeded """
+        from AppleScriptWrapper.scheduler import scheduler
+        futures = []
+        sequence = 0
+        for number, line in enumerate(lines, 1):
+            if self.stopped:
+                break
+            try:
+                command = self.parse(number, line)
+            except ValueError as e:
+                self.emit(sequence, {'line': number, 'ok': False, 'error': error_dict(e), 'ms': 0, 'wait_ms': 0})
+                sequence += 1
+                continue
+            if command is None:
+                continue
+            submitted = time.time()
+            if not self.parallel:
+                self.emit(sequence, self.execute(number, command, submitted))
+            else:
+                self._slots.acquire()   # don't read further ahead than max_pending commands
+                future = scheduler.submit(command['app'], self.execute, number, command, submitted)
+                future.add_done_callback(functools.partial(self._done, sequence))
+                futures.append(future)
+            sequence += 1
+        for future in futures:
+            future.exception()   # wait for everything
+        return self.failed == 0
+
+    def _done(self, sequence, future):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is None:
+            self.emit(sequence, future.result())
+
+    def summary(self):
+        return {'succeeded': self.succeeded, 'failed': self.failed, 'stopped': self.stopped}
+
+def run(path=None, parallel=False, ordered=False, stop_on_error=False, fake=False, out=sys.stdout, err=sys.stderr):
+    """ What the run command does; returns the exit status """
+    if fake:
+        from AppleScriptWrapper.Basic import use_backend
+        from AppleScriptWrapper.fakebackend import FakeBackend
+        use_backend(FakeBackend())
+    runbook = Runbook(out, parallel=parallel, ordered=ordered, stop_on_error=stop_on_error)
+    started = time.time()
+    with contextlib.redirect_stdout(err):   # the wrappers' chatter mustn't get mixed up with the results
+        if path is None or path == '-':
+            ok = runbook.run(sys.stdin)
+        else:
+            with open(path) as f:
+                ok = runbook.run(f)
+    summary = runbook.summary()
+    summary['seconds'] = time.time() - started
+    err.write(json.dumps(summary) + "\n")
+    return 0 if ok else 1
@@ -0,0 +1,206 @@
+"""
+Per-application command scheduler
+
+An app handles Apple Events one at a time, but different apps can be busy at once. The Scheduler keeps a queue
+for each app, worked through by that app's own thread, so that commands to one app run in order while commands
+to other apps carry on in parallel. Within a queue, jobs go by priority:
+
+   INTERACTIVE    dialogs, slide changes: anything a person is waiting on
+   NORMAL
+   BULK           background work such as Finder moves and ProVoc exports
+
+and then in the order they were submitted. An app can also be given a rate limit
+
+    from AppleScriptWrapper.scheduler import scheduler, BULK
+    future = finder.submit('move', paths, to_idiom='trash', priority=BULK)
+    scheduler.set_rate_limit('Finder', 5)   # no more than 5 jobs a second
+    scheduler.stats()['Finder']             # queue depth, waits, ...
+
+submit returns a concurrent.futures.Future
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', NORMAL: 'normal', BULK: 'bulk'}
+
+class RateLimit(object):
+    """ Token bucket: per_second jobs a second on average, up to burst in a row """
+
+    def __init__(self, per_second, burst=1):
+        self.per_second = float(per_second)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+
+    def delay(self):
+        """ Takes a token, returns how long to wait before it may be used """
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.per_second
+
+class _Job(object):
+    __slots__ = ('function', 'args', 'kwargs', 'priority', 'future', 'submitted')
+
+    def __init__(self, function, args, kwargs, priority):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = Future()
+        self.submitted = time.time()
+
+class AppQueue(object):
+    """ One app's jobs and the thread that runs them, plus the numbers for stats """
+
+    def __init__(self, scheduler, app_name):
+        self.scheduler = scheduler
+        self.app_name = app_name
+        self.heap = []
+        self.rate_limit = None
+        self.thread = None
+        self.running = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.throttled = 0.0
+
+    def stats(self):
+        done = self.completed + self.failed
+        depth = {}
+        for entry in self.heap:
+            name = PRIORITY_NAMES.get(entry[0], entry[0])
+            depth[name] = depth.get(name, 0) + 1
+        return {'depth': len(self.heap), 'depth_by_priority': depth, 'running': self.running is not None,
+                'submitted': self.submitted, 'completed': self.completed, 'failed': self.failed,
+                'cancelled': self.cancelled, 'wait_mean': self.wait_total / done if done else 0.0,
+                'wait_max': self.wait_max, 'run_mean': self.run_total / done if done else 0.0,
+                'throttled': self.throttled}
+
+class Scheduler(object):
+    """
+    Threads are started when an app is first given work, and stop once its queue has been empty for idle_timeout seconds
+    """
+    def __init__(self, idle_timeout=5.0):
+        self.idle_timeout = idle_timeout
+        self._queues = {}
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def _queue(self, app_name):
+        queue = self._queues.get(app_name)
+        if queue is None:
+            queue = self._queues[app_name] = AppQueue(self, app_name)
+        return queue
+
+    def submit(self, app_name, function, *args, **kwargs):
+        """
+        Queues function(*args, **kwargs) for app_name, returns a Future
+        Takes priority=INTERACTIVE|NORMAL|BULK as a keyword (default NORMAL)
+        """
+        priority = kwargs.pop('priority', NORMAL)
+        job = _Job(function, args, kwargs, priority)
+        with self._condition:
+            queue = self._queue(app_name)
+            heapq.heappush(queue.heap, (priority, next(self._order), job))
+            queue.submitted += 1
+            if queue.thread is None:
+                queue.thread = threading.Thread(target=self._work, args=(queue,),
+                                                name="Scheduler {0}".format(app_name))
+                queue.thread.daemon = True
+                queue.thread.start()
+            self._condition.notify_all()
+        return job.future
+
+    def set_rate_limit(self, app_name, per_second, burst=1):
+        """ At most per_second jobs a second for app_name (bursts of up to burst); None to lift the limit """
+        with self._condition:
+            self._queue(app_name).rate_limit = None if per_second is None else RateLimit(per_second, burst)
+
+    def _next_job(self, queue):
+        """ Blocks until there is a job for queue; None once it has been idle too long, in which case the thread is done """
+        with self._condition:
+            deadline = time.time() + self.idle_timeout
+            while not queue.heap:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    queue.thread = None
+                    return None
+                self._condition.wait(remaining)
+            job = queue.running = heapq.heappop(queue.heap)[2]
+            return job
+
+    def _work(self, queue):
+        while True:
+            job = self._next_job(queue)
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                with self._condition:
+                    queue.running = None
+                    queue.cancelled += 1
+                continue
+            if queue.rate_limit is not None:
+                with self._condition:
+                    delay = queue.rate_limit.delay()
+                    queue.throttled += delay
+                if delay:
+                    time.sleep(delay)
+            started = time.time()
+            waited = started - job.submitted
+            try:
+                result = job.function(*job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+                ok = False
+            else:
+                job.future.set_result(result)
+                ok = True
+            with self._condition:
+                queue.running = None
+                queue.wait_total += waited
+                queue.wait_max = max(queue.wait_max, waited)
+                queue.run_total += time.time() - started
+                if ok:
+                    queue.completed += 1
+                else:
+                    queue.failed += 1
+
+    def depth(self, app_name):
+        """ Jobs waiting for app_name, not counting one that's running """
+        with self._condition:
+            queue = self._queues.get(app_name)
+            return len(queue.heap) if queue else 0
+
+    def stats(self):
+        """ {app name: numbers}, see AppQueue.stats """
+        with self._condition:
+            return dict((name, queue.stats()) for name, queue in self._queues.items())
+
+    def drain(self, timeout=None):
+        """ Waits until every queue is empty and idle, returns whether that happened within timeout """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._condition:
+                busy = any(queue.heap or queue.running is not None for queue in self._queues.values())
+            if not busy:
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+
+scheduler = Scheduler()
@@ -0,0 +1,161 @@
+"""
+A long-running process that keeps wrappers warm, so short-lived scripts don't pay for startup
+
+    python -m AppleScriptWrapper serve [--socket PATH] [--warm APP ...] [--fake]
+
+listens on a Unix socket (SOCKET_PATH unless told otherwise) for requests, one JSON object per line:
+
+    {"id": 1, "app": "Keynote", "method": "get_title_of_slide", "args": [2], "kwargs": {}}
+    {"id": 2, "op": "ping"}         also "stats" and "shutdown"
+
+and answers each with one line:
+
+    {"id": 1, "ok": true, "result": "Introduction", "ms": 3.1}
+    {"id": 1, "ok": false, "error": {"type": "CommandError", "message": "...", "number": -1728}, "ms": 2.0}
+
+method is anything the app's wrapper can do, the same as tell_app_to_do, and arguments and results go
+through jsonable.py. Requests for one app are run one at a time, different apps at once (see scheduler.py),
+however many clients are connected. client.py is the other end
+
+--fake serves fakebackend.FakeBackend instead of appscript, which is how to try it out without a Mac
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import socketserver
+
+from AppleScriptWrapper.jsonable import jsonable, from_jsonable, error_dict
+from AppleScriptWrapper.client import SOCKET_PATH
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            response = self.server.wrapper_server.respond(line)
+            self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+            self.wfile.flush()
+            if response.get('op') == 'shutdown':
+                return
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class WrapperServer(object):
+    """ Answers requests with wrappers from Basic.get_app, which keeps them between requests """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self.started = None
+        self.requests = 0
+        self.errors = 0
+        self._server = None
+
+    def warm(self, app_names):
+        """ Makes the wrappers (and fetches terminology and Standard Additions) ahead of the first request """
+        from AppleScriptWrapper.Basic import get_app, standard_additions_pool
+        for name in app_names:
+            get_app(name)
+        standard_additions_pool.warm_up(*app_names)
+
+    def call(self, app_name, method, args=(), kwargs=None):
+        """ What a request does, on the app's scheduler queue """
+        from AppleScriptWrapper.Basic import get_app
+        from AppleScriptWrapper.scheduler import scheduler, INTERACTIVE
+        args = from_jsonable(list(args))
+        kwargs = from_jsonable(kwargs or {})
+        def run():
+            return getattr(get_app(app_name), method)(*args, **kwargs)
+        return scheduler.submit(app_name, run, priority=INTERACTIVE).result()
+
+    def respond(self, line):
+        """ Response (a dict) to a request line """
+        start = time.time()
+        response = {}
+        try:
+            request = json.loads(line.decode('utf-8') if isinstance(line, bytes) else line)
+            response['id'] = request.get('id')
+            op = request.get('op')
+            if op:
+                response['op'] = op
+                response['result'] = self.operation(op)
+            else:
+                result = self.call(request['app'], request['method'], request.get('args', ()), request.get('kwargs'))
+                response['result'] = jsonable(result)
+            response['ok'] = True
+        except Exception as e:
+            self.errors += 1
+            response['ok'] = False
+            response['error'] = error_dict(e)
+        self.requests += 1
+        response['ms'] = (time.time() - start) * 1000
+        return response
+
+    def operation(self, op):
+        if op == 'ping':
+            return 'pong'
+        if op == 'stats':
+            return self.stats()
+        if op == 'shutdown':
+            threading.Thread(target=self.shutdown).start()   # can't wait for serve_forever from inside a request
+            return 'bye'
+        raise ValueError("Unknown op {0!r}".format(op))
+
+    def stats(self):
+        from AppleScriptWrapper.scheduler import scheduler
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started if self.started else 0,
+                'requests': self.requests, 'errors': self.errors, 'apps': jsonable(scheduler.stats())}
+
+    def serve_forever(self):
+        """ Listens until shutdown is called (or a shutdown request comes in) """
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._remove_stale_socket()
+        old_umask = os.umask(0o077)   # only this user can talk to it
+        try:
+            self._server = _UnixServer(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.wrapper_server = self
+        self.started = time.time()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _remove_stale_socket(self):
+        """ A socket left behind by a server that's gone; one that answers means a server is already running """
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except (socket.error, OSError):
+            os.remove(self.path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError("A server is already listening on {0}".format(self.path))
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+def serve(path=SOCKET_PATH, warm=(), fake=False):
+    if fake:
+        from AppleScriptWrapper.Basic import use_backend
+        from AppleScriptWrapper.fakebackend import FakeBackend
+        use_backend(FakeBackend())
+    server = WrapperServer(path)
+    if warm:
+        server.warm(warm)
+    print("Listening on {0}".format(path))
+    server.serve_forever()
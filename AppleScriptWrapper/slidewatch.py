@@ -0,0 +1,300 @@
+"""
+Watching a Keynote presentation from the outside, eg for lecture capture
+
+    monitor = keynote.slide_monitor()
+    monitor.on(SLIDE_CHANGED, lambda event: print(event.slide, event.change, event.latency))
+    monitor.on(PLAY_STOPPED, lambda event: monitor.stop())
+    monitor.run()                  # or monitor.start() to watch from a thread
+
+Each probe asks for Keynote's playing and frontmost together (see snapshot.py) and, while a slideshow is playing,
+for the number of the current slide, so a probe is one or two requests and nothing is parsed out of references.
+Callbacks are only called when something actually changed. Probing starts every min_interval seconds, slows by
+backoff while nothing happens up to max_interval, and goes straight back to min_interval after a change
+(idle_interval is used while nothing is playing). Each event carries its latency: how long at most it can have
+been between the change happening and it being noticed
+
+While editing, a SlideContentTracker notices when the current slide's text changes:
+
+    tracker = keynote.slide_content_tracker()
+    for change in tracker.watch(while_=lambda: not keynote.is_playing()):
+        print(change.slide, change.fields)          # eg 3 ('title',)
+
+Each check is one request for the current slide's number and text; only a short hash of each field is kept,
+per slide, and a SlideContentChange comes out only when one of them differs from last time. When while_ asks
+Keynote something too, watch(while_every=4) asks it every fourth interval instead of checking, so that
+watching stays at one request per interval
+"""
+
+import time
+import hashlib
+import threading
+
+from AppleScriptWrapper.snapshot import snapshot
+
+SLIDE_CHANGED = 'slide_changed'
+PLAY_STARTED = 'play_started'
+PLAY_STOPPED = 'play_stopped'
+FRONTMOST_CHANGED = 'frontmost_changed'
+KINDS = (SLIDE_CHANGED, PLAY_STARTED, PLAY_STOPPED, FRONTMOST_CHANGED)
+
+class SlideState(object):
+    """ What one probe found; slide is None while not playing """
+    __slots__ = ('playing', 'frontmost', 'slide', 'started', 'finished')
+
+    def __init__(self, playing, frontmost, slide, started, finished):
+        self.playing = playing
+        self.frontmost = frontmost
+        self.slide = slide
+        self.started = started
+        self.finished = finished
+
+    def __repr__(self):
+        return "<SlideState playing={0} frontmost={1} slide={2}>".format(self.playing, self.frontmost, self.slide)
+
+class SlideEvent(object):
+    """
+    kind is one of KINDS, slide the current slide number (None if not known) and previous the one before
+    change is slide - previous for SLIDE_CHANGED, 0 otherwise
+    latency is in seconds, from when the probe before last started to when this one finished
+    """
+    __slots__ = ('kind', 'slide', 'previous', 'change', 'playing', 'frontmost', 'detected', 'latency')
+
+    def __init__(self, kind, state, previous, before):
+        self.kind = kind
+        self.slide = state.slide
+        self.previous = previous
+        self.change = state.slide - previous if kind == SLIDE_CHANGED else 0
+        self.playing = state.playing
+        self.frontmost = state.frontmost
+        self.detected = state.finished
+        self.latency = state.finished - before.started
+
+    def __repr__(self):
+        return "<SlideEvent {0} slide={1} change={2} latency={3:.0f}ms>".format(
+            self.kind, self.slide, self.change, self.latency * 1000)
+
+class SlideMonitor(object):
+
+    def __init__(self, keynote, min_interval=0.05, max_interval=0.5, idle_interval=1.0, backoff=1.5):
+        self.keynote = keynote
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = idle_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.state = None
+        self.baseline = None   # the state when watching began
+        self.probes = 0
+        self.events_seen = 0
+        self.callback_errors = 0
+        self.last_error = None
+        self._latencies = []
+        self._probe_seconds = 0.0
+        self._callbacks = dict((kind, []) for kind in KINDS)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on(self, kind, callback):
+        """ Calls callback(event) for each event of kind (one of KINDS, or '*' for all of them) """
+        kinds = KINDS if kind == '*' else [kind]
+        for each in kinds:
+            if each not in self._callbacks:
+                raise ValueError("No such slide event: {0}".format(each))
+            self._callbacks[each].append(callback)
+        return callback
+
+    def probe(self):
+        """ SlideState as it is now, in one request, two while playing """
+        started = time.time()
+        found = snapshot(self.keynote.application, ('playing', 'frontmost'), self.keynote.backend)
+        slide = self.keynote.current_slide().slide_number() if found.playing else None
+        state = SlideState(bool(found.playing), bool(found.frontmost), slide, started, time.time())
+        self.probes += 1
+        self._probe_seconds += state.finished - state.started
+        return state
+
+    def compare(self, before, after):
+        """ The events that going from state before to state after amounts to """
+        events = []
+        if after.playing and not before.playing:
+            events.append(SlideEvent(PLAY_STARTED, after, before.slide, before))
+        elif before.playing and not after.playing:
+            after.slide = before.slide   # still the slide it stopped on as far as anyone watching is concerned
+            events.append(SlideEvent(PLAY_STOPPED, after, before.slide, before))
+        elif after.playing and after.slide != before.slide:
+            events.append(SlideEvent(SLIDE_CHANGED, after, before.slide, before))
+        if after.frontmost != before.frontmost:
+            events.append(SlideEvent(FRONTMOST_CHANGED, after, before.slide, before))
+        return events
+
+    def dispatch(self, event):
+        self.events_seen += 1
+        self._latencies.append(event.latency)
+        for callback in self._callbacks[event.kind]:
+            try:
+                callback(event)
+            except Exception as e:
+                self.callback_errors += 1   # one bad callback mustn't stop the watching
+                self.last_error = e
+
+    def update(self, state):
+        """
+        Moves on to state, a new probe: calls back for what changed, sets the interval before the next probe
+        Returns the events; for driving the monitor from somewhere other than events(), eg an event loop
+        """
+        events = self.compare(self.state, state)
+        self.state = state
+        self.interval = self._next_interval(bool(events))
+        for event in events:
+            self.dispatch(event)
+        return events
+
+    def _next_interval(self, changed):
+        if changed:
+            return self.min_interval
+        if not self.state.playing:
+            return self.idle_interval
+        return min(self.max_interval, self.interval * self.backoff)
+
+    def events(self, while_=None, timeout=None):
+        """
+        Probes until stop() is called, timeout seconds have passed, Keynote quits or while_(state) is false,
+        yielding each SlideEvent once its callbacks have been called
+        """
+        self._stop.clear()
+        return self._events(while_, timeout)
+
+    def _events(self, while_, timeout):
+        deadline = None if timeout is None else time.time() + timeout
+        self.state = self.baseline = self.probe()   # what changes are measured against
+        self.interval = self.min_interval
+        while not self._stop.is_set():
+            if while_ is not None and not while_(self.state):
+                return
+            now = time.time()
+            if deadline is not None and now >= deadline:
+                return
+            sleep = self.interval if deadline is None else min(self.interval, deadline - now)
+            if self._stop.wait(sleep):
+                return
+            try:
+                state = self.probe()
+            except Exception:
+                if self.keynote.is_running():
+                    raise
+                state = SlideState(False, False, None, time.time(), time.time())
+                self._stop.set()
+            for event in self.update(state):
+                yield event
+
+    def run(self, while_=None, timeout=None):
+        """ Watches, calling the callbacks, until told to stop; returns the stats """
+        self._stop.clear()
+        return self._watch(while_, timeout)
+
+    def _watch(self, while_=None, timeout=None):
+        for event in self._events(while_, timeout):
+            pass
+        return self.stats()
+
+    def start(self):
+        """ Watches from a daemon thread """
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='SlideMonitor')
+        self._thread.daemon = True
+        self._thread.start()
+        return self._thread
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        return {'probes': self.probes, 'events': self.events_seen, 'interval': self.interval,
+                'probe_ms': self._probe_seconds / self.probes * 1000 if self.probes else 0.0,
+                'latency_mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+                'latency_max_ms': latencies[-1] * 1000 if latencies else 0.0,
+                'callback_errors': self.callback_errors}
+
+def content_hash(text):
+    """ Short hash of a field's text, ignoring surrounding whitespace as Keynote adds it at will """
+    return hashlib.blake2b((text or "").strip().encode('utf-8'), digest_size=8).digest()
+
+class SlideContentChange(object):
+    """
+    slide is the slide number, fields the names of the fields that changed, values the text of every field now
+    reference is a reference to the slide
+    """
+    __slots__ = ('slide', 'fields', 'values', 'reference')
+
+    def __init__(self, slide, fields, values, reference):
+        self.slide = slide
+        self.fields = fields
+        self.values = values
+        self.reference = reference
+
+    def __repr__(self):
+        return "<SlideContentChange slide={0} fields={1}>".format(self.slide, self.fields)
+
+class SlideContentTracker(object):
+
+    def __init__(self, keynote, fields=('title', 'body', 'notes')):
+        self.keynote = keynote
+        self.fields = tuple(fields)
+        self.hashes = {}   # slide number -> tuple of content_hash, one per field
+        self.current = None
+        self.checks = 0
+        self.changes = 0
+
+    def check(self):
+        """ Reads the current slide in one request, returns a SlideContentChange if its text has changed, else None """
+        reference = self.keynote.current_slide()
+        found = snapshot(reference, ('slide_number',) + self.fields, self.keynote.backend)
+        self.checks += 1
+        self.current = found.slide_number
+        hashes = tuple(content_hash(getattr(found, name)) for name in self.fields)
+        before = self.hashes.get(found.slide_number)
+        self.hashes[found.slide_number] = hashes
+        if before is None or before == hashes:
+            return None   # a slide seen for the first time is where comparisons start, not a change
+        self.changes += 1
+        changed = tuple(name for name, old, new in zip(self.fields, before, hashes) if old != new)
+        values = dict((name, (getattr(found, name) or "").strip()) for name in self.fields)
+        return SlideContentChange(found.slide_number, changed, values, self.keynote.get_slide_reference(found.slide_number))
+
+    def forget(self, slide=None):
+        """ Drops the hashes of slide, or of every slide, eg after slides have been moved around """
+        if slide is None:
+            self.hashes.clear()
+        else:
+            self.hashes.pop(slide, None)
+
+    def watch(self, interval=0.25, while_=None, cancel=None, while_every=1):
+        """
+        Checks every interval seconds, yielding each SlideContentChange, until while_() is false
+        or cancel (a threading.Event) is set
+        With while_every n > 1, while_ is only asked every nth time, in place of that time's check,
+        so that each interval costs one request when while_ asks the app something too
+        """
+        ticks = 0
+        while True:
+            asking = ticks % while_every == 0
+            if asking and while_ is not None and not while_():
+                return
+            if not asking or while_every == 1:
+                change = self.check()
+                if change is not None:
+                    yield change
+            ticks += 1
+            if cancel is not None:
+                if cancel.wait(interval):
+                    return
+            else:
+                time.sleep(interval)
+
+    def stats(self):
+        return {'checks': self.checks, 'changes': self.changes, 'slides': len(self.hashes)}
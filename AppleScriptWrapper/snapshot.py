@@ -0,0 +1,120 @@
+"""
+Several properties of an object, or of every object in a collection, fetched in one request
+
+    slide = keynote.snapshot(keynote.current_slide(), ['title', 'body'])
+    slide.title, slide.body
+
+    docs = textedit.snapshot_elements(textedit.application.documents, ['name', 'path', 'modified'])
+    [d.name for d in docs if d.modified]
+
+Both ask for properties (AppleScript's "properties of"), which comes back as a record of every property, and keep
+the ones wanted. For a collection that is one request however many objects there are. Anything properties leaves
+out, or an app that doesn't support it, is made up for with one request per field (per collection, not per object)
+
+What comes back are Records: immutable, with __slots__ for just the fields asked for
+"""
+
+_record_classes = {}
+
+class Record(object):
+    """ Base for the classes record_class makes """
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.fields, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshots can't be changed, take a new one")
+
+    def __delattr__(self, name):
+        raise AttributeError("Snapshots can't be changed, take a new one")
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.fields)
+
+    def as_dict(self):
+        return dict(zip(self.fields, self.values()))
+
+    def __eq__(self, other):
+        return isinstance(other, Record) and self.fields == other.fields and self.values() == other.values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.fields, self.values()))
+
+    def __repr__(self):
+        return "<Snapshot {0}>".format(", ".join("{0}={1!r}".format(name, value) for name, value in self.as_dict().items()))
+
+def record_class(fields):
+    """ Record class with just these fields, made once for each set of fields """
+    fields = tuple(fields)
+    cls = _record_classes.get(fields)
+    if cls is None:
+        cls = type('Snapshot', (Record,), {'__slots__': fields, 'fields': fields})
+        _record_classes[fields] = cls
+    return cls
+
+def _name(key):
+    """ Keys of a properties record are keywords (k.name) """
+    return getattr(key, 'name', key)
+
+def _properties(reference, backend):
+    """ reference.properties() as {name: value} (a list of them for a collection), or None if the app won't say """
+    try:
+        found = reference.properties()
+    except Exception as e:
+        if backend.is_missing_reference(e):
+            raise   # nothing there, asking field by field won't help
+        return None
+    if isinstance(found, dict):
+        return dict((_name(key), value) for key, value in found.items())
+    if isinstance(found, list) and all(isinstance(row, dict) for row in found):
+        return [dict((_name(key), value) for key, value in row.items()) for row in found]
+    return None
+
+def snapshot(reference, fields, backend=None):
+    """ Record of fields of the object reference refers to """
+    if backend is None:
+        from AppleScriptWrapper.backend import get_backend
+        backend = get_backend()
+    found = _properties(reference, backend)
+    if not isinstance(found, dict):
+        found = {}
+    values = []
+    for name in fields:
+        if name in found:
+            values.append(found[name])
+        else:
+            values.append(getattr(reference, name)())
+    return record_class(fields)(*values)
+
+def snapshot_elements(reference, fields, backend=None):
+    """ List of Records, one for each element reference refers to (eg app.documents), fetched column by column if need be """
+    if backend is None:
+        from AppleScriptWrapper.backend import get_backend
+        backend = get_backend()
+    rows = _properties(reference, backend)
+    if not isinstance(rows, list):
+        rows = None
+    columns = {}
+    for name in fields:
+        if rows is None or not all(name in row for row in rows):
+            columns[name] = getattr(reference, name)()
+    if rows is None:
+        count = len(next(iter(columns.values()))) if columns else 0
+        rows = [{} for i in range(count)]
+    cls = record_class(fields)
+    records = []
+    for i, row in enumerate(rows):
+        records.append(cls(*[columns[name][i] if name in columns else row[name] for name in fields]))
+    return records
@@ -0,0 +1,147 @@
+"""
+Disk cache of application terminology, so appscript doesn't have to read and parse an app's scripting
+dictionary every time a script starts
+
+The first time an app is used its terminology is dumped with appscript.terminology.dump into
+~/.AppleScriptWrapper/terminology/, in a module named after the app's bundle identifier and version
+(from its Info.plist), which is then handed to appscript.app(name, terms=module). When the app is updated
+its version changes, so the old dump stops being used and is replaced. Within a process each app's identity
+is worked out once, so later calls don't touch the disk; terminology_cache.forget(name) works it out again
+
+AppscriptBackend.app uses the shared cache below. To fill it ahead of time:
+
+    python -m AppleScriptWrapper prewarm [app names]
+
+Anything that goes wrong along the way means appscript is left to get the terminology itself, as before
+"""
+
+import os
+import re
+import plistlib
+import importlib.util
+
+TERMINOLOGY_DIR = os.path.expanduser('~/.AppleScriptWrapper/terminology')
+
+class TerminologyCache(object):
+
+    def __init__(self, directory=TERMINOLOGY_DIR, enabled=True):
+        self.directory = directory
+        self.enabled = enabled and os.environ.get('APPLESCRIPTWRAPPER_TERMINOLOGY_CACHE', '1') != '0'
+        self._modules = {}   # (bundle id, version) -> module
+        self._identities = {}   # app name -> (bundle id, version), or None for an app that can't be found
+        self.hits = 0
+        self.misses = 0
+
+    def app_path(self, app_name):
+        """ Where the app is, or None """
+        try:
+            from aem import findapp
+            return findapp.byname(app_name)
+        except Exception:
+            return None
+
+    def identity(self, app_path):
+        """ (bundle identifier, version) from the app's Info.plist, or None """
+        try:
+            with open(os.path.join(app_path, 'Contents', 'Info.plist'), 'rb') as f:
+                info = plistlib.load(f)
+        except Exception:
+            return None
+        bundle = info.get('CFBundleIdentifier')
+        if not bundle:
+            return None
+        version = "{0}-{1}".format(info.get('CFBundleShortVersionString', ''), info.get('CFBundleVersion', ''))
+        return bundle, version
+
+    def module_path(self, identity):
+        bundle, version = identity
+        name = "{0}__{1}".format(re.sub(r'[^0-9A-Za-z]+', '_', bundle), re.sub(r'[^0-9A-Za-z]+', '_', version))
+        return os.path.join(self.directory, "terms_{0}.py".format(name))
+
+    def terms_for(self, app_name):
+        """ Terminology module for app_name, dumping it first if need be; None if it can't be had """
+        if not self.enabled:
+            return None
+        if app_name in self._identities:   # already worked out, so no looking at the disk
+            identity = self._identities[app_name]
+            module = identity and self._modules.get(identity)
+            if module is not None or not identity:
+                self.hits += bool(module)
+                return module
+        app_path = self.app_path(app_name)
+        identity = self._identities[app_name] = app_path and self.identity(app_path) or None
+        if not identity:
+            return None
+        module = self._modules.get(identity)
+        if module is not None:
+            self.hits += 1
+            return module
+        path = self.module_path(identity)
+        try:
+            if os.path.exists(path):
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._dump(app_path, identity, path)
+            module = self._load(path)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)   # unreadable, dump it again next time
+            return None
+        self._modules[identity] = module
+        return module
+
+    def _dump(self, app_path, identity, path):
+        from appscript import terminology
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self._remove_stale(identity)
+        partial = path + '.partial'
+        terminology.dump(app_path, partial)
+        os.rename(partial, path)   # so that a dump that's cut short is never loaded
+
+    def _remove_stale(self, identity):
+        """ Dumps for other versions of the same app """
+        current = os.path.basename(self.module_path(identity))
+        prefix = current.split('__', 1)[0] + '__'
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name != current:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _load(self, path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def prewarm(self, app_names):
+        """ Dumps terminology for each app now, returns {app name: path of the dump, or None if it couldn't be} """
+        done = {}
+        for app_name in app_names:
+            module = self.terms_for(app_name)
+            done[app_name] = self.module_path(self._identities[app_name]) if module else None
+        return done
+
+    def forget(self, app_name=None):
+        """ Works out again where app_name (or every app) is and which version it is, eg after updating it """
+        if app_name is None:
+            self._identities.clear()
+        else:
+            self._identities.pop(app_name, None)
+
+    def clear(self):
+        self._modules = {}
+        self._identities = {}
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.startswith('terms_'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'loaded': len(self._modules)}
+
+terminology_cache = TerminologyCache()
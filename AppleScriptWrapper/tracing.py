@@ -0,0 +1,280 @@
+"""
+Apple Event tracing: what a wrapper sends, how long each event takes and what it cost a high-level call
+
+    tracer = keynote.enable_tracing()
+    keynote.import_foreign_slide('Other', 3)
+    print(tracer.summary())
+    tracer.dump('/tmp/keynote.jsonl')
+
+While tracing is enabled the wrapper's application (and its System Events process and Standard Additions)
+are wrapped in TracedReference, so that every call made through them is timed and recorded under the command
+it sends (get for a property or element), along with the span labels active at the time (see span). References
+that come back are wrapped too, so calls made with them are recorded as well. Nothing is wrapped while tracing
+is disabled, so there's no overhead
+"""
+
+import time
+import threading
+import collections
+
+from AppleScriptWrapper.backend import get_backend
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+
+class TraceEvent(object):
+    __slots__ = ('app', 'path', 'command', 'started', 'duration', 'error', 'span', 'thread')
+
+    def __init__(self, app, path, command, started, duration, error, span, thread):
+        self.app = app
+        self.path = path
+        self.command = command
+        self.started = started
+        self.duration = duration
+        self.error = error
+        self.span = span
+        self.thread = thread
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return "<TraceEvent {0} {1} {2:.2f}ms{3}>".format(self.path, self.command, self.duration * 1000,
+                                                          "" if self.ok else " error={0}".format(self.error))
+
+class Histogram(object):
+    """ Durations of one command, bucketed in milliseconds (see BUCKETS_MS) """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, duration, error=None):
+        self.count += 1
+        if error is not None:
+            self.errors += 1
+        self.total += duration
+        self.minimum = duration if self.minimum is None else min(self.minimum, duration)
+        self.maximum = duration if self.maximum is None else max(self.maximum, duration)
+        ms = duration * 1000
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {'count': self.count, 'errors': self.errors, 'total': self.total, 'mean': self.mean,
+                'min': self.minimum, 'max': self.maximum,
+                'buckets': dict((str(bound), n) for bound, n in zip(BUCKETS_MS, self.buckets) if n)}
+
+def _error_code(e):
+    """ The Apple Event error number if there is one, else the exception's class name """
+    number = getattr(e, 'errornumber', None)
+    return number if number is not None else type(e).__name__
+
+class Tracer(object):
+    """
+    Keeps the last capacity events in a ring buffer, and histograms per (app, command) for all of them
+    One tracer can be shared by several wrappers
+    """
+    def __init__(self, capacity=1000):
+        self.events = collections.deque(maxlen=capacity)
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # Spans
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current_span(self):
+        """ Active span labels on this thread, outermost first, joined with / (None outside any span) """
+        stack = self._stack()
+        return "/".join(stack) if stack else None
+
+    def span(self, label):
+        """ with tracer.span('label'): labels every event sent in the block, spans nest """
+        return _Span(self, label)
+
+    # Recording
+
+    def record(self, app, path, command, started, duration, error=None):
+        event = TraceEvent(app, path, command, started, duration, error, self.current_span(),
+                           threading.current_thread().name)
+        with self._lock:
+            self.events.append(event)
+            key = (app, command)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.add(duration, error)
+        return event
+
+    def call(self, app, path, command, function, args, kwargs):
+        """ Calls function, recording how long it took and whether it failed """
+        started = time.time()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            self.record(app, path, command, started, time.time() - started, _error_code(e))
+            raise
+        self.record(app, path, command, started, time.time() - started)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.histograms = {}
+
+    # Reporting
+
+    def events_in(self, span):
+        """ Events recorded in span, or in any span nested inside it """
+        return [e for e in list(self.events) if e.span and span in e.span.split("/")]
+
+    def stats(self):
+        """ {'app command': histogram dict} """
+        with self._lock:
+            return dict(("{0} {1}".format(app, command), h.as_dict()) for (app, command), h in self.histograms.items())
+
+    def summary(self):
+        """ One line per command, slowest in total first """
+        with self._lock:
+            rows = sorted(self.histograms.items(), key=lambda item: -item[1].total)
+        lines = ["{0:<20} {1:<24} {2:>6} {3:>6} {4:>10} {5:>10}".format('app', 'command', 'count', 'errors', 'mean ms', 'max ms')]
+        for (app, command), h in rows:
+            lines.append("{0:<20} {1:<24} {2:>6} {3:>6} {4:>10.2f} {5:>10.2f}".format(
+                app, command, h.count, h.errors, h.mean * 1000, (h.maximum or 0) * 1000))
+        return "\n".join(lines)
+
+    def dump(self, destination):
+        """ Writes the buffered events as JSON lines to destination, a path or a file object; returns how many """
+        events = list(self.events)
+        if hasattr(destination, 'write'):
+            return self._write(events, destination)
+        with open(destination, 'w') as f:
+            return self._write(events, f)
+
+    def _write(self, events, f):
+        import json
+        for event in events:
+            f.write(json.dumps(event.as_dict(), default=str) + "\n")
+        return len(events)
+
+class _Span(object):
+
+    def __init__(self, tracer, label):
+        self.tracer = tracer
+        self.label = label
+
+    def __enter__(self):
+        self.tracer._stack().append(self.label)
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.tracer._stack().pop()
+
+def _unwrap(value):
+    """ References inside arguments have to be given to the backend as they are """
+    if isinstance(value, TracedReference):
+        return value._reference
+    if isinstance(value, list):
+        return [_unwrap(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_unwrap(v) for v in value)
+    if isinstance(value, dict):
+        return dict((k, _unwrap(v)) for k, v in value.items())
+    return value
+
+def _wrap(tracer, app, value):
+    """ References in what came back, wrapped so that what's done with them is traced too """
+    if isinstance(value, list):
+        return [_wrap(tracer, app, v) for v in value]
+    if get_backend().is_reference(value):
+        return TracedReference(tracer, app, value)
+    return value
+
+class TracedReference(object):
+    """
+    Stands in for a reference, handing out more of itself, and records every call made with it
+    command is what calling it sends: get for a reference, or the command's name
+    """
+    __slots__ = ('_tracer', '_app', '_reference', '_command')
+
+    def __init__(self, tracer, app, reference, command='get'):
+        self._tracer = tracer
+        self._app = app
+        self._reference = reference
+        self._command = command
+
+    def __getattr__(self, name):
+        found = getattr(self._reference, name)
+        return TracedReference(self._tracer, self._app, found, 'get' if get_backend().is_reference(found) else name)
+
+    def __getitem__(self, key):
+        return TracedReference(self._tracer, self._app, self._reference[_unwrap(key)])
+
+    def ID(self, value):
+        return TracedReference(self._tracer, self._app, self._reference.ID(value))
+
+    def __call__(self, *args, **kwargs):
+        result = self._tracer.call(self._app, repr(self._reference), self._command, self._reference,
+                                   _unwrap(args), _unwrap(kwargs))
+        return _wrap(self._tracer, self._app, result)
+
+    def __iter__(self):
+        return iter(self._reference)
+
+    def __eq__(self, other):
+        return self._reference == _unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._reference)
+
+    def __repr__(self):
+        return repr(self._reference)
+
+def trace(tracer, app, reference):
+    """ reference wrapped for tracer, or as it is if tracer is None """
+    if tracer is None or reference is None or isinstance(reference, TracedReference):
+        return reference
+    return TracedReference(tracer, app, reference)
+
+def untrace(reference):
+    return _unwrap(reference)
+
+def span(label=None):
+    """
+    Decorator for wrapper methods: while tracing, events sent by the method are labelled "AppName.label"
+    label defaults to the method's name. Costs one dictionary lookup when tracing is off
+    """
+    def decorate(method):
+        name = label or method.__name__
+        def spanned(self, *args, **kwargs):
+            tracer = self.__dict__.get('tracer')
+            if tracer is None:
+                return method(self, *args, **kwargs)
+            with tracer.span("{0}.{1}".format(self.app_name, name)):
+                return method(self, *args, **kwargs)
+        spanned.__name__ = method.__name__
+        spanned.__doc__ = method.__doc__
+        return spanned
+    return decorate
@@ -0,0 +1,19 @@
+import pytest
+
+from AppleScriptWrapper.Basic import use_backend, get_app
+from AppleScriptWrapper.fakebackend import FakeBackend
+
+@pytest.fixture
+def world():
+    """ A fresh FakeBackend for each test, with the wrappers made for the last one forgotten """
+    return use_backend(FakeBackend())
+
+@pytest.fixture
+def app(world):
+    """ app('Keynote'): the wrapper, with fixed pauses of nothing instead of the shared pacer """
+    def make(name):
+        wrapper = get_app(name)
+        wrapper.pacer = None
+        wrapper._wait = 0
+        return wrapper
+    return make
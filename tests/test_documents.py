@@ -0,0 +1,37 @@
+import time
+
+def test_open_documents_in_one_request(world, app):
+    textedit = app('TextEdit')
+    world.reset_events()
+    assert textedit.file_is_open('Untitled.txt')
+    assert not textedit.file_is_open('Other.txt')
+    assert len(world.events) == 1
+
+def test_close_then_query(world, app):
+    textedit = app('TextEdit')
+    assert textedit.file_is_open('Untitled.txt')
+    textedit.close(textedit.current_document())
+    assert not textedit.file_is_open('Untitled.txt')
+
+def test_make_then_query(world, app):
+    textedit = app('TextEdit')
+    assert not textedit.file_is_open('New.txt')
+    textedit.make(new=textedit.k('document'), with_properties={textedit.k('name'): 'New.txt'})
+    assert textedit.file_is_open('New.txt')
+
+def test_mutation_noticed_with_memo_off(world, app):
+    textedit = app('TextEdit')
+    textedit.memo = None
+    assert textedit.file_is_open('Untitled.txt')
+    textedit.close(textedit.current_document())
+    assert not textedit.file_is_open('Untitled.txt')
+
+def test_ttl_expiry_and_changes(world, app):
+    textedit = app('TextEdit')
+    textedit.document_index_ttl = 0.05
+    index = textedit.document_index()
+    textedit.application.make(new=textedit.k('document'), with_properties={textedit.k('name'): 'Raw.txt'})
+    assert not index.is_open('Raw.txt')   # sent behind the wrapper's back, so not noticed yet
+    time.sleep(0.06)
+    assert index.is_open('Raw.txt')
+    assert [entry.name for entry in index.changes.opened] == ['Raw.txt']
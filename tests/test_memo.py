@@ -0,0 +1,60 @@
+import time
+
+from AppleScriptWrapper.memo import PropertyMemo
+
+def test_repeated_reads_are_one_request(world, app):
+    keynote = app('Keynote')
+    keynote.is_playing()
+    world.reset_events()
+    keynote.is_playing()
+    keynote.is_playing()
+    assert world.events == []
+    assert keynote.memo.hits == 2
+
+def test_ttl_expiry():
+    calls = []
+    memo = PropertyMemo({'playing': 0.05})
+    read = lambda: calls.append(1) or len(calls)
+    assert memo.fetch('playing', read) == 1
+    assert memo.fetch('playing', read) == 1
+    time.sleep(0.06)
+    assert memo.fetch('playing', read) == 2
+
+def test_lru_eviction():
+    memo = PropertyMemo({'name': 10}, maxsize=2)
+    for i in range(3):
+        memo.fetch('name', lambda i=i: i, (i,))
+    assert len(memo) == 2 and memo.evictions == 1
+    memo.fetch('name', lambda i: 'again', (0,))   # the oldest was the one dropped
+    assert memo.misses == 4
+
+def test_invalidate_by_name():
+    memo = PropertyMemo({'name': 10, 'path': 10})
+    memo.fetch('name', lambda: 'a')
+    memo.fetch('path', lambda: 'b')
+    memo.invalidate('name')
+    assert memo.stats()['size'] == 1
+
+def test_mutating_command_through_wrapper_forgets(world, app):
+    keynote = app('Keynote')
+    assert keynote.is_playing() is False
+    keynote.start()
+    assert keynote.is_playing() is True
+    keynote.playing()
+    keynote.advance()             # through __getattr__, in MUTATING
+    assert len(keynote.memo) == 0
+
+def test_send_forgets(world, app):
+    keynote = app('Keynote')
+    keynote.current_slide_num()
+    keynote.is_playing()
+    keynote.send(keynote.application.start)
+    assert keynote.is_playing() is True
+
+def test_memo_off(world, app):
+    keynote = app('Keynote')
+    keynote.memo = None
+    keynote.is_playing()
+    world.reset_events()
+    keynote.is_playing()
+    assert len(world.events) == 1
@@ -0,0 +1,52 @@
+def commands(world):
+    return [event.command for event in world.events]
+
+def test_warm_click_is_one_request(world, app):
+    preview = app('Preview')
+    preview.click_menu_item('Window', 'Zoom')
+    assert preview.menu_item_present('Window', 'Zoom')
+    world.reset_events()
+    preview.click_menu_item('Window', 'Zoom')
+    assert commands(world) == ['click']
+
+def test_click_missing_item_does_nothing(world, app):
+    preview = app('Preview')
+    preview.click_menu_item('Window', 'No Such Item')
+    assert commands(world).count('click') == 2   # tried once more in case the app wasn't ready
+
+def test_queries_answered_from_snapshot(world, app):
+    keynote = app('Keynote')
+    assert keynote.menu_item_enabled('File', 'Save')
+    world.reset_events()
+    assert keynote.menu_item_enabled('File', 'Save')
+    assert keynote.submenu_item_present('Insert', 'Chart', 'Bar')
+    assert world.events == []
+
+def test_click_makes_only_that_menu_stale(world, app):
+    keynote = app('Keynote')
+    assert keynote.menu_item_checked('View', 'Navigator') is False
+    keynote.toggle_menu_item('View', 'Navigator')
+    world.reset_events()
+    assert keynote.menu_item_enabled('File', 'Save')
+    assert world.events == []
+    assert keynote.menu_item_checked('View', 'Navigator') is True
+    assert world.events   # re-read, as View was clicked in
+
+def test_keystrokes_leave_snapshot_alone(world, app):
+    keynote = app('Keynote')
+    keynote.menu_item_enabled('File', 'Save')
+    keynote.keystroke_convenience('a')
+    world.reset_events()
+    assert keynote.menu_item_enabled('File', 'Save')
+    assert world.events == []
+
+def test_missing_item_rereads_once(world, app):
+    keynote = app('Keynote')
+    keynote.menu_item_enabled('File', 'Save')
+    world.reset_events()
+    assert not keynote.menu_item_present('File', 'Print')
+    reread = len(world.events)
+    assert reread
+    world.reset_events()
+    keynote.menu_item_present('File', 'Print')
+    assert len(world.events) == reread
@@ -0,0 +1,37 @@
+from AppleScriptWrapper.slidewatch import SlideMonitor
+
+def test_one_request_per_interval(world, app):
+    keynote = app('Keynote')
+    tracker = keynote.slide_content_tracker()
+    asked = []
+    def while_():
+        asked.append(len(world.events))
+        if len(asked) == 2:
+            keynote.get_slide_reference(1).title.set('Edited')
+        return len(asked) < 3
+    world.reset_events()
+    changes = list(tracker.watch(interval=0, while_=lambda: while_() and keynote.playing_and_frontmost() is not None,
+                                 while_every=4))
+    assert [change.fields for change in changes] == [('title',)]
+    requests = [event for event in world.events if event.command != 'set']
+    assert tracker.checks == 6
+    assert len(requests) == tracker.checks + len(asked) - 1   # the last ask ends the watch before its request
+
+def test_detect_play_or_edit(world, app):
+    keynote = app('Keynote')
+    messages = keynote.detect_play_or_edit()
+    keynote.get_slide_reference(1).body.set('Changed')
+    first = next(messages)
+    assert first['modified'] and first['fields'] == ['body']
+    keynote.start()
+    assert next(messages)['play_state_changed']
+
+def test_monitor_events(world, app):
+    keynote = app('Keynote')
+    monitor = SlideMonitor(keynote)
+    monitor.state = monitor.probe()
+    keynote.start()
+    assert [event.kind for event in monitor.update(monitor.probe())] == ['play_started', 'frontmost_changed']
+    keynote.advance()
+    events = monitor.update(monitor.probe())
+    assert [(event.kind, event.slide, event.change) for event in events] == [('slide_changed', 2, 1)]